@@ -0,0 +1,237 @@
+"""
+NumPy batch combat engine.
+
+Holds thousands of independent encounters (a party against one wave) as
+struct-of-arrays and advances all of them one round at a time. The rules are
+the same as game.combat_round / game.run_wave:
+
+- turn order by speed (descending), players before monsters on equal speed
+- players hit the alive monster with the lowest HP, monsters the alive player
+  with the lowest HP (ties: first in list)
+- damage = max(1, atk - df) + randint(0, max(1, base // 2))
+
+Only the random streams differ, so the outcome *distribution* matches the
+scalar path. `python batch_engine.py --check` compares both statistically,
+`python batch_engine.py` alone measures the throughput.
+"""
+import sys
+import math
+import time
+import random
+
+try:
+    import numpy as np
+except Exception:
+    print("NumPy ist nicht installiert. Bitte installiere es mit:\n  .venv\\Scripts\\python.exe -m pip install numpy")
+    raise
+
+from game import CHAR_TEMPLATES, make_character, init_materials, run_wave, arg_value
+from events import NullSink
+
+DEMO_KEYS = ["1", "2", "3"]
+_NO_TARGET = np.iinfo(np.int64).max
+
+
+class BatchCombat:
+    """E encounters with S = P players + M monster slots each.
+
+    All stat arrays have shape (E, S); columns [0, P) are players, [P, S)
+    monsters. Unused monster slots simply start with hp 0."""
+
+    def __init__(self, hp, atk, df, spd, num_players: int, rng=None):
+        self.hp = np.array(hp, dtype=np.int64, order='C')
+        self.atk = np.array(atk, dtype=np.int64, order='C')
+        self.df = np.array(df, dtype=np.int64, order='C')
+        self.spd = np.array(spd, dtype=np.int64, order='C')
+        self.num_players = num_players
+        self.rng = rng if rng is not None else np.random.default_rng()
+        # speeds never change during a wave, so the turn order is fixed;
+        # stored as one column array per turn slot
+        width = self.hp.shape[1]
+        order = np.argsort(-self.spd, axis=1, kind='stable')
+        self._turns = [np.ascontiguousarray(order[:, k]) for k in range(width)]
+        self.rounds = np.zeros(len(self.hp), dtype=np.int64)
+        # per side (0 = players, 1 = monsters): first/last column, alive count
+        # and current target. Damage only ever lowers the HP of the target, so
+        # the lowest-HP target only changes when it dies.
+        self._cols = ((0, num_players), (num_players, self.hp.shape[1]))
+        self._alive = [(self.hp[:, first:last] > 0).sum(axis=1) for first, last in self._cols]
+        self._target = [np.zeros(len(self.hp), dtype=np.int64) for _ in self._cols]
+        all_rows = np.arange(len(self.hp))
+        self._retarget(all_rows, 0)
+        self._retarget(all_rows, 1)
+
+    @classmethod
+    def from_encounters(cls, encounters, rng=None):
+        """Build from a list of (players, monsters) object lists, e.g. a party
+        and generate_wave(n). All parties must have the same size."""
+        num_players = len(encounters[0][0])
+        width = num_players + max(len(ms) for _, ms in encounters)
+        shape = (len(encounters), width)
+        hp, atk, df, spd = (np.zeros(shape, dtype=np.int64) for _ in range(4))
+        for e, (players, monsters) in enumerate(encounters):
+            for s, ent in enumerate(list(players) + list(monsters)):
+                hp[e, s], atk[e, s], df[e, s], spd[e, s] = ent.hp, ent.atk, ent.df, ent.spd
+        return cls(hp, atk, df, spd, num_players, rng)
+
+    @classmethod
+    def from_wave(cls, party_keys, wave_number: int, n: int, rng=None):
+        """n encounters of a fresh CHAR_TEMPLATES party against wave `wave_number`,
+        with the wave drawn vectorized from the same distribution as generate_wave."""
+        rng = rng if rng is not None else np.random.default_rng()
+        templates = [CHAR_TEMPLATES[k] for k in party_keys]
+        party = {stat: np.tile([t[stat] for t in templates], (n, 1)) for stat in ('hp', 'atk', 'df', 'spd')}
+        wave = wave_arrays(wave_number, n, rng)
+        stats = [np.concatenate([party[s], wave[s]], axis=1) for s in ('hp', 'atk', 'df', 'spd')]
+        return cls(*stats, num_players=len(templates), rng=rng)
+
+    def players_alive(self):
+        return self._alive[0] > 0
+
+    def monsters_alive(self):
+        return self._alive[1] > 0
+
+    def active(self):
+        return self.players_alive() & self.monsters_alive()
+
+    def _retarget(self, rows, side: int):
+        # lowest-HP alive target of `side`, ties -> first column
+        first, last = self._cols[side]
+        hp = self.hp[rows, first:last]
+        self._target[side][rows] = first + np.where(hp > 0, hp, _NO_TARGET).argmin(axis=1)
+
+    def _attack(self, rows, attackers, side: int):
+        # flat indices into the (E, S) arrays are much cheaper than 2D fancy indexing
+        width = self.hp.shape[1]
+        targets = rows * width + self._target[side][rows]
+        base = np.maximum(1, self.atk.ravel()[rows * width + attackers] - self.df.ravel()[targets])
+        dmg = base + (self.rng.random(len(rows)) * (np.maximum(1, base // 2) + 1)).astype(np.int64)
+        flat_hp = self.hp.ravel()
+        hp = np.maximum(0, flat_hp[targets] - dmg)
+        flat_hp[targets] = hp
+        killed = rows[hp == 0]
+        if len(killed):
+            self._alive[side][killed] -= 1
+            self._retarget(killed, side)
+
+    def step(self) -> bool:
+        """Advance every unfinished encounter by one round.
+        Returns False once all encounters are decided."""
+        rows = np.flatnonzero(self.active())
+        if not len(rows):
+            return False
+        self.rounds[rows] += 1
+        P, width = self.num_players, self.hp.shape[1]
+        flat_hp = self.hp.ravel()
+        row_base = rows * width
+        for turn in self._turns:
+            actor = turn[rows]
+            acting = flat_hp[row_base + actor] > 0
+            is_player = actor < P
+            # a side without living opponents ends the round (no target)
+            mask = acting & is_player & (self._alive[1][rows] > 0)
+            if mask.any():
+                self._attack(rows[mask], actor[mask], 1)
+            mask = acting & ~is_player & (self._alive[0][rows] > 0)
+            if mask.any():
+                self._attack(rows[mask], actor[mask], 0)
+        return True
+
+    def run(self, max_rounds: int = 10_000):
+        """Fight all encounters to the end. Returns (players_won, rounds)."""
+        for _ in range(max_rounds):
+            if not self.step():
+                break
+        return self.players_alive(), self.rounds
+
+
+def wave_arrays(wave_number: int, n: int, rng):
+    """Vectorized generate_wave: dict of (n, M) int arrays for hp/atk/df/spd."""
+    if wave_number == 1:
+        one = np.ones((n, 2), dtype=np.int64)
+        return {'hp': one * 40, 'atk': one * 6, 'df': one * 2, 'spd': one * 5}
+    count = min(1 + wave_number, 5)
+    # same draw order per goblin as generate_wave is not needed, only the distribution
+    wave = {
+        'hp': 30 + wave_number * 8 + rng.integers(-5, 6, size=(n, count)),
+        'atk': 5 + wave_number * 2 + rng.integers(-1, 3, size=(n, count)),
+        'df': np.full((n, count), 2 + wave_number // 2, dtype=np.int64),
+        'spd': rng.integers(3, 8, size=(n, count)),
+    }
+    if wave_number % 3 == 0:
+        boss = {'hp': 80 + wave_number * 10, 'atk': 14 + wave_number * 2, 'df': 6 + wave_number // 2, 'spd': 4}
+        for stat, value in boss.items():
+            wave[stat] = np.concatenate([wave[stat], np.full((n, 1), value, dtype=np.int64)], axis=1)
+    return wave
+
+
+def scalar_encounters(party_keys, wave_number: int, n: int, rng):
+    """Reference: the same encounters through game.run_wave, one at a time."""
+    won = np.zeros(n, dtype=bool)
+    rounds = np.zeros(n, dtype=np.int64)
+    for i in range(n):
+        players = [make_character(f"Spieler{j}", k) for j, k in enumerate(party_keys, 1)]
+        init_materials(players)
+        stats = {}
+        won[i] = run_wave(players, wave_number, rng=rng, sink=NullSink(), stats=stats)
+        rounds[i] = stats['rounds']
+    return won, rounds
+
+
+def _two_sided_p(z: float) -> float:
+    return math.erfc(abs(z) / math.sqrt(2))
+
+
+def compare_engines(party_keys, wave_number: int, n: int, seed: int = 0):
+    """Run n encounters on both engines and test that win rate and mean rounds
+    agree (two-sample z-tests). Returns a dict with both estimates and p-values."""
+    won_s, rounds_s = scalar_encounters(party_keys, wave_number, n, random.Random(seed))
+    won_b, rounds_b = BatchCombat.from_wave(party_keys, wave_number, n, np.random.default_rng(seed)).run()
+
+    p_s, p_b = won_s.mean(), won_b.mean()
+    pooled = (won_s.sum() + won_b.sum()) / (2 * n)
+    se = math.sqrt(pooled * (1 - pooled) * 2 / n)
+    p_win = _two_sided_p((p_s - p_b) / se) if se > 0 else float(p_s == p_b)
+
+    se_r = math.sqrt(rounds_s.var(ddof=1) / n + rounds_b.var(ddof=1) / n)
+    diff_r = rounds_s.mean() - rounds_b.mean()
+    p_rounds = _two_sided_p(diff_r / se_r) if se_r > 0 else float(diff_r == 0)
+    return {
+        'wave': wave_number,
+        'win_scalar': float(p_s), 'win_batch': float(p_b), 'p_win': p_win,
+        'rounds_scalar': float(rounds_s.mean()), 'rounds_batch': float(rounds_b.mean()), 'p_rounds': p_rounds,
+    }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    n = int(arg_value(argv, '--n', 20000))
+    seed = int(arg_value(argv, '--seed', 0))
+    waves = [int(w) for w in arg_value(argv, '--waves', '1,2,3,4,6').split(',')]
+
+    if '--check' in argv:
+        # p-values far below 0.001 mean the engines disagree
+        print(f"Vergleich skalar vs. NumPy ({n} Begegnungen pro Welle, Party {'/'.join(DEMO_KEYS)})")
+        failed = False
+        for w in waves:
+            r = compare_engines(DEMO_KEYS, w, n, seed)
+            ok = r['p_win'] > 0.001 and r['p_rounds'] > 0.001
+            failed |= not ok
+            print(f"Welle {w}: Sieg {r['win_scalar']:.3f} / {r['win_batch']:.3f} (p={r['p_win']:.3f}), "
+                  f"Runden {r['rounds_scalar']:.2f} / {r['rounds_batch']:.2f} (p={r['p_rounds']:.3f}) "
+                  f"{'OK' if ok else 'ABWEICHUNG'}")
+        sys.exit(1 if failed else 0)
+
+    # default: throughput
+    for w in waves:
+        start = time.perf_counter()
+        scalar_encounters(DEMO_KEYS, w, n // 10, random.Random(seed))
+        scalar_rate = (n // 10) / (time.perf_counter() - start)
+        start = time.perf_counter()
+        BatchCombat.from_wave(DEMO_KEYS, w, n, np.random.default_rng(seed)).run()
+        batch_rate = n / (time.perf_counter() - start)
+        print(f"Welle {w}: skalar {scalar_rate:,.0f}/s, NumPy {batch_rate:,.0f}/s ({batch_rate / scalar_rate:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,460 @@
+"""
+Benchmark suite for the hot paths of the game.
+
+Every scenario has a fixed seed and a fixed size, so two runs on the same
+machine measure the same work:
+
+  damage            200,000 x calculate_damage
+  combat_3v5        full fight of the demo party against a 5-goblin wave
+  combat_4v500      one combat_round, 4 players against 500 monsters
+  generate_wave     2,000 x generate_wave over waves 1-20
+  generate_horde    generate_horde(40) (1,640 goblins)
+  run_wave          run_wave (NullSink) for waves 1-6, fresh party each
+  run_wave_horde    run_wave in horde mode, wave 12
+  solver_wave2      exact solver (solver.py), demo party against one wave-2 fight
+  craft_plan        2,000 x plan_crafts (auto-crafting), random inventories, cold caches
+  gui_frame         full redraw of a 100x100 gui.py world, 1,000 monsters, HUD
+  gui_frame_dirty   100 frames of gui.Renderer on the same world, player walking
+  gui_frame_big     the same on a 5000x5000 world with 20,000 monsters
+  gui_chase         100 flow-field chase ticks, 500 monsters around the player
+  savegame_world    checkpoint of a 1000x1000 gui.py world, 5,000 monsters: save + load in memory
+  sim3d_projectiles one projectile tick of sim3d, 200 projectiles vs 500 enemies
+  sim3d_enemies     10 enemy ticks of sim3d, 500 enemies
+  sim3d_match       a headless 3D match of 3,600 ticks (one minute), bot player
+  gui3d_sync        10 ticks of gui3d drawing sim3d: events, interpolation
+
+pygame and ursina run headless (SDL dummy driver, offscreen window), so the
+suite also works on a CI box without GPU. Scenarios whose dependencies are
+missing are skipped with a reason.
+
+Usage:
+  python bench.py                              # run all, print table
+  python bench.py --json bench.json            # also store the results
+  python bench.py --save-baseline              # store as bench_baseline.json
+  python bench.py --baseline bench_baseline.json --threshold 10
+  python bench.py --only combat_4v500,gui_frame --repeat 9
+
+With a baseline, scenarios whose median got slower by more than --threshold
+percent are flagged as REGRESSION and the exit code is 1.
+"""
+import os
+import sys
+import json
+import math
+import time
+import zlib
+import random
+import platform
+import statistics
+
+# must be set before pygame / ursina open a window
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('URSINA_WINDOW_TYPE', 'offscreen')
+
+from game import (make_character, init_materials, Monster, generate_wave, generate_horde,
+                  calculate_damage, combat_round, run_wave, plan_crafts, arg_value)
+from events import NullSink
+
+DEMO_KEYS = ["1", "2", "3"]
+SEED = 12345
+BASELINE_PATH = 'bench_baseline.json'
+SCENARIOS = {}
+
+
+class Skip(Exception):
+    """Raised by a scenario setup when a dependency is not available."""
+
+
+def scenario(name: str):
+    """Register `setup(rng) -> run` under `name`. setup is not timed; it
+    returns the callable that is timed (one call per repetition)."""
+    def register(setup):
+        SCENARIOS[name] = setup
+        return setup
+    return register
+
+
+def make_party(keys=DEMO_KEYS):
+    players = [make_character(f"Spieler{i}", k) for i, k in enumerate(keys, 1)]
+    init_materials(players)
+    return players
+
+
+# --- combat / game logic -------------------------------------------------------
+
+@scenario('damage')
+def setup_damage(rng):
+    def run():
+        for i in range(200_000):
+            calculate_damage(20 + i % 7, 5, rng)
+    return run
+
+
+@scenario('combat_3v5')
+def setup_combat_3v5(rng):
+    players = make_party()
+    monsters = generate_wave(4, rng)  # 5 goblins
+
+    def run():
+        while any(p.is_alive() for p in players) and any(m.is_alive() for m in monsters):
+            combat_round(players, monsters, rng)
+    return run
+
+
+@scenario('combat_4v500')
+def setup_combat_4v500(rng):
+    players = make_party(["1", "2", "3", "4"])
+    for p in players:
+        p.hp = p.max_hp = 100_000  # survive the round, so every monster gets its turn
+    monsters = [Monster(f"Goblin_{i+1}", 40 + rng.randint(-5, 5), 8, 3, rng.randint(3, 7)) for i in range(500)]
+
+    def run():
+        combat_round(players, monsters, rng)
+    return run
+
+
+@scenario('generate_wave')
+def setup_generate_wave(rng):
+    def run():
+        for i in range(2000):
+            generate_wave(1 + i % 20, rng)
+    return run
+
+
+@scenario('generate_horde')
+def setup_generate_horde(rng):
+    def run():
+        generate_horde(40, rng)
+    return run
+
+
+@scenario('run_wave')
+def setup_run_wave(rng):
+    sink = NullSink()
+    parties = [make_party() for _ in range(6)]
+
+    def run():
+        for wave, players in enumerate(parties, 1):
+            run_wave(players, wave, auto=True, rng=rng, sink=sink)
+    return run
+
+
+@scenario('run_wave_horde')
+def setup_run_wave_horde(rng):
+    sink = NullSink()
+    players = make_party()
+    for p in players:
+        p.hp = p.max_hp = 100_000
+
+    def run():
+        run_wave(players, 12, auto=True, rng=rng, sink=sink, horde=True)
+    return run
+
+
+@scenario('solver_wave2')
+def setup_solver_wave2(rng):
+    import solver
+    monsters = generate_wave(2, rng)
+    players = make_party()
+
+    def run():
+        # no warm caches from the previous repetition
+        for cached in (solver.damage_pmf, solver.hits_to_kill, solver._kill_table, solver._hit):
+            cached.cache_clear()
+        solver.solve_encounter(players, monsters)
+    return run
+
+
+@scenario('craft_plan')
+def setup_craft_plan(rng):
+    import game
+    players = make_party()
+    situations = []
+    for i in range(2000):
+        inventory = {m: rng.randint(0, 8) for m in game.MATERIAL_TYPES}
+        situations.append((players[i % len(players)], inventory, rng.randint(1, 100), 1 + i % 10))
+
+    def run():
+        for cached in (game._craft_options, game._best_plan):
+            cached.cache_clear()
+        for p, inventory, hp_percent, wave in situations:
+            p.inventory = inventory
+            p.hp = max(1, p.max_hp * hp_percent // 100)
+            plan_crafts(p, wave)
+    return run
+
+
+# --- pygame GUI -----------------------------------------------------------------
+
+def _load_gui():
+    try:
+        import pygame
+        import gui
+    except Exception as e:
+        raise Skip(f"pygame nicht verfuegbar ({e})")
+    return pygame, gui
+
+
+def _gui_world(rng, size: int, monsters: int, blocks: float = 0.1):
+    pygame, gui = _load_gui()
+    gui.configure(size, size)
+    pygame.init()
+    font = pygame.font.Font(None, 18)
+    grid = gui.TileMap(size, size)
+    if blocks:
+        for y in range(size):
+            for x in range(size):
+                if rng.random() < blocks:
+                    grid[x, y] = gui.BLOCK
+    player = gui.make_player('1')
+    player.inventory = {m: 3 for m in gui.MATERIAL_TYPES}
+    return pygame, gui, font, grid, gui.spawn_monsters(monsters, rng), player
+
+
+@scenario('gui_frame')
+def setup_gui_frame(rng):
+    pygame, gui, font, grid, monsters, player = _gui_world(rng, 100, 1000)
+    # the whole world on one surface, as gui.py drew it before the viewport
+    screen = pygame.Surface((gui.TILE * gui.COLS, gui.TILE * gui.ROWS + 80))
+
+    def run():
+        screen.fill(gui.BLACK)
+        gui.draw_grid(screen, grid)
+        gui.draw_monsters(screen, monsters)
+        gui.draw_hud(screen, font, player, top=gui.TILE * gui.ROWS)
+    return run
+
+
+def _walk(rng, size: int, monsters: int, blocks: float):
+    pygame, gui, font, grid, monsters, player = _gui_world(rng, size, monsters, blocks)
+    renderer = gui.Renderer(pygame.Surface((gui.WIDTH, gui.HEIGHT)), font, grid)
+    start = size // 2
+    renderer.draw(monsters, player, start, start)  # first full frame is not timed
+
+    def run():
+        for i in range(100):
+            renderer.draw(monsters, player, start + i % 10, start)
+    return run
+
+
+@scenario('gui_frame_dirty')
+def setup_gui_frame_dirty(rng):
+    return _walk(rng, 100, 1000, 0.1)
+
+
+@scenario('gui_frame_big')
+def setup_gui_frame_big(rng):
+    return _walk(rng, 5000, 20_000, 0)
+
+
+@scenario('gui_chase')
+def setup_gui_chase(rng):
+    pygame, gui, font, grid, _, player = _gui_world(rng, 100, 0)
+    monsters = gui.MonsterMap()
+    for i in range(500):
+        x, y = 50 + rng.randint(-20, 20), 50 + rng.randint(-20, 20)
+        monsters.add(gui.Monster(f'Goblin_{i+1}', 30, 6, 2, 4), x, y)
+    grid.fill(48, 48, 4, 1, gui.EMPTY)  # free path for the player
+    field = gui.FlowField(grid)
+
+    def run():
+        for tick in range(100):
+            field.update(48 + tick // 25, 48)
+            gui.move_monsters(monsters, field)
+    return run
+
+
+@scenario('savegame_world')
+def setup_savegame_world(rng):
+    pygame, gui, font, grid, monsters, player = _gui_world(rng, 1000, 5000)
+    import savegame
+
+    def run():
+        payload = savegame.encode_world(grid, gui.CHUNK, player, 500, 500, monsters, rng)
+        data = zlib.compress(payload, savegame.ZLIB_LEVEL)
+        savegame.decode_world(zlib.decompress(data))
+    return run
+
+
+# --- 3D prototype ---------------------------------------------------------------
+
+def _sim_world(rng, enemies: int, projectiles: int):
+    """A sim3d.World with enemies spread over the field and projectiles
+    fired from random positions in random directions."""
+    import sim3d
+    world = sim3d.World(rng.randrange(2**32))
+    size = sim3d.GRID_SIZE
+    for _ in range(enemies):
+        e = world.spawn_enemy()
+        e.x = e.prev_x = rng.uniform(-size, size)
+        e.z = e.prev_z = rng.uniform(-size, size)
+    for _ in range(projectiles):
+        angle = rng.uniform(0, 2 * math.pi)
+        world.set_player((rng.uniform(-size, size), 0, rng.uniform(-size, size)), (math.sin(angle), 0, math.cos(angle)))
+        world.fire()
+    world.set_player((0, 0, 0), (0, 0, 1))
+    return world
+
+
+@scenario('sim3d_projectiles')
+def setup_sim3d_projectiles(rng):
+    world = _sim_world(rng, enemies=500, projectiles=200)
+
+    def run():
+        world.move_projectiles(1 / 60)
+    return run
+
+
+@scenario('sim3d_enemies')
+def setup_sim3d_enemies(rng):
+    world = _sim_world(rng, enemies=500, projectiles=0)
+
+    def run():
+        for _ in range(10):
+            world.move_enemies(1 / 60)
+    return run
+
+
+@scenario('sim3d_match')
+def setup_sim3d_match(rng):
+    import sim3d
+    seed = rng.randrange(2**32)
+
+    def run():
+        sim3d.play(3600, seed)
+    return run
+
+
+def _load_gui3d():
+    try:
+        from ursina import mouse
+    except Exception as e:
+        raise Skip(f"ursina nicht verfuegbar ({e})")
+    if os.environ['URSINA_WINDOW_TYPE'] != 'onscreen':
+        # an offscreen buffer cannot capture the mouse (FirstPersonController locks it)
+        cls = type(mouse)
+        cls.locked = property(cls.locked.fget, lambda self, value: setattr(self, '_locked', value))
+    try:
+        import gui3d
+    except Exception as e:
+        raise Skip(f"ursina-Fenster konnte nicht geoeffnet werden ({e})")
+    return gui3d
+
+
+@scenario('gui3d_sync')
+def setup_gui3d_sync(rng):
+    gui3d = _load_gui3d()
+    # fresh world for the view; entities of the previous run go back to the pools
+    for pool, entities in ((gui3d.enemy_pool, gui3d.enemy_entities), (gui3d.projectile_pool, gui3d.projectile_entities)):
+        for e in entities.values():
+            pool.release(e)
+        entities.clear()
+    world = gui3d.world = _sim_world(rng, enemies=500, projectiles=200)
+    gui3d.sync_events()
+
+    def run():
+        for _ in range(10):
+            world.step()
+            gui3d.sync_events()
+            gui3d.interpolate(0.5)
+    return run
+
+
+# --- runner ---------------------------------------------------------------------
+
+def measure(setup, repeat: int, seed: int = SEED):
+    """Time `repeat` runs, each with a fresh setup from the same seed."""
+    times = []
+    for _ in range(repeat):
+        run = setup(random.Random(seed))
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1000)
+    return {'best_ms': round(min(times), 3), 'median_ms': round(statistics.median(times), 3), 'runs': repeat}
+
+
+def run_benchmarks(names, repeat: int, seed: int = SEED):
+    results = {}
+    for name in names:
+        try:
+            results[name] = measure(SCENARIOS[name], repeat, seed)
+        except Skip as e:
+            results[name] = {'skipped': str(e)}
+        print(format_result(name, results[name]), flush=True)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'seed': seed,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def format_result(name: str, r) -> str:
+    if 'skipped' in r:
+        return f"{name:<18} uebersprungen: {r['skipped']}"
+    return f"{name:<18} median {r['median_ms']:10.2f} ms   bestes {r['best_ms']:10.2f} ms"
+
+
+def compare(results, baseline, threshold: float):
+    """Return (name, old median, new median, change in %, regression?) for
+    every scenario measured in both runs."""
+    rows = []
+    for name, r in results['results'].items():
+        old = baseline['results'].get(name)
+        if 'median_ms' not in r or not old or 'median_ms' not in old:
+            continue
+        change = (r['median_ms'] / old['median_ms'] - 1) * 100 if old['median_ms'] else 0.0
+        rows.append((name, old['median_ms'], r['median_ms'], change, change > threshold))
+    return rows
+
+
+def save_json(path: str, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    repeat = int(arg_value(argv, '--repeat', 5))
+    seed = int(arg_value(argv, '--seed', SEED))
+    threshold = float(arg_value(argv, '--threshold', 10))
+    json_path = arg_value(argv, '--json')
+    baseline_path = arg_value(argv, '--baseline')
+    only = arg_value(argv, '--only')
+    names = only.split(',') if only else list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        print(f"Unbekannte Szenarien: {', '.join(unknown)}. Verfuegbar: {', '.join(SCENARIOS)}")
+        sys.exit(2)
+
+    print(f"Benchmarks: {len(names)} Szenarien, {repeat} Wiederholungen, Seed {seed}")
+    results = run_benchmarks(names, repeat, seed)
+    if json_path:
+        save_json(json_path, results)
+        print(f"Ergebnisse gespeichert in {json_path}")
+    if '--save-baseline' in argv:
+        save_json(baseline_path or BASELINE_PATH, results)
+        print(f"Baseline gespeichert in {baseline_path or BASELINE_PATH}")
+        return
+
+    if baseline_path:
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nVergleich mit {baseline_path} (Schwelle {threshold:.0f}%):")
+        regressions = 0
+        for name, old, new, change, slower in compare(results, baseline, threshold):
+            regressions += slower
+            print(f"{name:<18} {old:10.2f} -> {new:10.2f} ms  {change:+6.1f}%{'  REGRESSION' if slower else ''}")
+        if regressions:
+            print(f"{regressions} Regression(en) gefunden")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+curses frontend for game.py: fixed panels instead of scrolling text.
+
+  python game.py --curses --auto --horde
+  python game.py --curses --refresh 10 --verbosity 3
+
+The screen shows a status line, the party with HP bars, the enemies of the
+current wave (in horde mode the groups and how many are left) and the tail
+of the log; interactive prompts use the bottom line. CursesSink only updates
+this model when an event arrives and redraws at most --refresh times per
+second (and before every prompt), so the fight runs at full speed
+underneath. Only screen rows whose text changed are written, and curses
+sends only the changed cells to the terminal.
+
+Without curses (Windows without `pip install windows-curses`) or without a
+terminal (output redirected), game.py keeps the normal console output.
+"""
+import sys
+import locale
+from collections import deque
+
+from game import ConsoleSink, WaveJob, format_monster
+from events import ROUND
+from profiler import clock
+
+try:
+    import curses
+except ImportError:
+    curses = None
+
+REFRESH_HZ = 20      # screen updates per second while the game runs
+LOG_LINES = 1000     # log lines kept (the panel shows the tail)
+EXIT_LOG_LINES = 12  # log lines printed to the terminal after the screen closes
+HP_BAR = 20          # width of the HP bars
+MAX_ANSWER = 200     # longest answer read at a prompt
+
+
+def hp_bar(hp: int, max_hp: int, width: int = HP_BAR) -> str:
+    filled = min(width, round(width * max(hp, 0) / max_hp)) if max_hp else 0
+    return '[' + '#' * filled + '.' * (width - filled) + ']'
+
+
+class CursesSink(ConsoleSink):
+    """Event sink that draws the game into fixed panels on a curses screen.
+    Log lines are the ConsoleSink texts; waves, rounds and the party go to
+    their panels instead. `io` answers prompts on the same screen. Run the
+    game through watch() so the party panel and the summary on close()
+    follow the real players."""
+
+    def __init__(self, screen, level: int = ROUND, refresh: float = REFRESH_HZ):
+        super().__init__(level)
+        self.screen = screen
+        self.interval = 1 / refresh if refresh > 0 else 0.0
+        self.party = {}        # name -> {'role', 'symbol', 'hp', 'max_hp', 'alive'}
+        self.players = []      # the Character objects, once watch() saw a wave
+        self.enemies = []      # monster dicts of the current wave
+        self.remaining = None  # horde mode: (monsters, groups) left after the last round
+        self.log = deque(maxlen=LOG_LINES)
+        self.seed = None
+        self.wave = 0
+        self.round = 0
+        self.events = 0
+        self.frames = 0
+        self._drawn = 0.0
+        self._rows = {}   # screen row -> (text, attr) on screen
+        self._handlers = {}  # event kind -> (update_<kind>, render_<kind>), None if missing
+        self._size = None
+        self._colors = {'low': curses.A_BOLD, 'dead': curses.A_DIM, 'title': curses.A_BOLD}
+        if curses.has_colors():
+            curses.start_color()
+            curses.use_default_colors()
+            curses.init_pair(1, curses.COLOR_RED, -1)
+            curses.init_pair(2, curses.COLOR_YELLOW, -1)
+            self._colors['low'] = curses.color_pair(1) | curses.A_BOLD
+            self._colors['title'] = curses.color_pair(2) | curses.A_BOLD
+        self.io = CursesIO(self)
+
+    # --- model -------------------------------------------------------------
+
+    def emit(self, kind: str, **data):
+        self.events += 1
+        handlers = self._handlers.get(kind)
+        if handlers is None:
+            handlers = self._handlers[kind] = (getattr(self, 'update_' + kind, None),
+                                               getattr(self, 'render_' + kind, None))
+        update, render = handlers
+        if update is not None:
+            update(**data)
+        if render is not None:
+            self.add_log(render(**data))
+        if clock() - self._drawn >= self.interval:
+            self.draw()
+
+    def add_log(self, text):
+        if text:
+            self.log.extend(text.strip('\n').split('\n'))
+
+    def update_game_start(self, auto, seed):
+        self.seed = seed
+
+    def watch(self, steps):
+        """Pass the steps of game.play through, remembering the players of
+        the WaveJobs: drive(sink.watch(play(...)), sink.io)."""
+        try:
+            step = next(steps)
+            while True:
+                if isinstance(step, WaveJob):
+                    self.players = step.players
+                step = steps.send((yield step))
+        except StopIteration as stop:
+            return stop.value
+
+    def sync_players(self):
+        """Copy HP and alive state of the real players into the party panel."""
+        for p in self.players:
+            entry = self.party.setdefault(p.player_name, {'role': p.role, 'symbol': p.symbol})
+            entry['hp'], entry['max_hp'], entry['alive'] = p.hp, p.max_hp, p.is_alive()
+
+    def update_party(self, players, auto):
+        for p in players:
+            self.party[p['name']] = {'role': p['role'], 'symbol': p['symbol'], 'hp': None, 'max_hp': None,
+                                     'alive': True}
+
+    def update_wave_start(self, wave, horde, monsters, total):
+        self.wave, self.round = wave, 0
+        self.enemies = monsters
+        self.remaining = (total, len(monsters)) if horde else None
+
+    def update_round_start(self, wave, round, players):
+        self.round = round
+        for p in players:
+            entry = self.party.setdefault(p['name'], {'role': '', 'symbol': ''})
+            entry['hp'], entry['max_hp'], entry['alive'] = p['hp'], p['max_hp'], p['hp'] > 0
+
+    def update_attack(self, attacker, target, damage, hp):
+        entry = self.party.get(target)
+        if entry is not None and entry.get('max_hp') is not None:
+            entry['hp'], entry['alive'] = hp, hp > 0
+
+    def update_death(self, name, side):
+        entry = self.party.get(name) if side == 'player' else None
+        if entry is not None:
+            entry['alive'] = False
+
+    def update_round_end(self, wave, round, monsters=None, remaining=None, groups=None):
+        if monsters is None:
+            self.remaining = (remaining, groups)
+        else:
+            self.enemies = monsters
+        self.sync_players()
+
+    def update_wave_end(self, wave, won, rounds):
+        self.sync_players()
+
+    def update_craft(self, player, item, auto, hp, max_hp, atk, df, placed_blocks):
+        if player in self.party:
+            self.party[player]['hp'], self.party[player]['max_hp'] = hp, max_hp
+            self.party[player]['alive'] = hp > 0
+
+    # panels instead of log text
+    def render_party(self, players, auto):
+        return None
+
+    def render_wave_start(self, wave, horde, monsters, total):
+        return f">>> WELLE {wave} GESTARTET! <<< ({total} Gegner)"
+
+    def render_round_start(self, wave, round, players):
+        return None
+
+    def render_round_end(self, wave, round, monsters=None, remaining=None, groups=None):
+        return None
+
+    # --- screen ------------------------------------------------------------
+
+    def layout(self, height: int):
+        """The screen as (text, attr) rows; the bottom row is left for prompts."""
+        colors = self._colors
+        rows = [(f" Klara  |  Welle {self.wave}  Runde {self.round}  |  {self.events:,} Ereignisse"
+                 f"  |  Seed {self.seed}", curses.A_REVERSE)]
+        rows.append(("-- Party --", colors['title']))
+        for name, p in self.party.items():
+            if p.get('hp') is None:
+                rows.append((f" {p['symbol']} {name} ({p['role']})", 0))
+                continue
+            hp, max_hp = p['hp'], p['max_hp']
+            attr = colors['dead'] if not p.get('alive', hp > 0) else colors['low'] if hp * 3 < max_hp else 0
+            rows.append((f" {p['symbol']} {name:<12} {hp_bar(hp, max_hp)} {max(hp, 0)}/{max_hp}  {p['role']}", attr))
+        title = "-- Gegner --"
+        if self.remaining:
+            title = f"-- Gegner: {self.remaining[0]} uebrig in {self.remaining[1]} Gruppen --"
+        rows.append((title, colors['title']))
+        # enemies get at most a third of what is left, the log the rest
+        space = max(1, (height - 1 - len(rows) - 1) // 3)
+        shown = self.enemies if len(self.enemies) <= space else self.enemies[:space - 1]
+        for m in shown:
+            if m['hp'] > 0:
+                rows.append((f" {hp_bar(m['hp'], m['max_hp'], HP_BAR // 2)} {format_monster(m)}", 0))
+            else:
+                rows.append((f" {m['name']} besiegt", colors['dead']))
+        if len(shown) < len(self.enemies):
+            rows.append((f" ... und {len(self.enemies) - len(shown)} weitere", 0))
+        rows.append(("-- Log --", colors['title']))
+        free = height - 1 - len(rows)
+        if free > 0:
+            rows += [(' ' + line, 0) for line in list(self.log)[-free:]]
+        rows = rows[:height - 1]
+        return rows + [('', 0)] * (height - 1 - len(rows))
+
+    def draw(self):
+        """Redraw now: only rows whose content changed are written."""
+        screen = self.screen
+        if screen is None:
+            return
+        height, width = screen.getmaxyx()
+        if (height, width) != self._size:
+            # new terminal size: everything is redrawn
+            self._size = (height, width)
+            self._rows = {}
+            screen.clear()
+        for y, row in enumerate(self.layout(height)):
+            if self._rows.get(y) != row:
+                text, attr = row
+                try:
+                    screen.addnstr(y, 0, text, width - 1, attr)
+                    screen.clrtoeol()
+                except curses.error:
+                    pass  # text wider than the terminal
+                self._rows[y] = row
+        screen.noutrefresh()
+        curses.doupdate()
+        self._drawn = clock()
+        self.frames += 1
+
+    def flush(self):
+        self.draw()
+
+    def ask(self, prompt: str) -> str:
+        """Show the prompt in the bottom row and read one line."""
+        lines = prompt.strip('\n').split('\n')
+        self.add_log('\n'.join(lines[:-1]))
+        self.draw()
+        screen = self.screen
+        height, width = screen.getmaxyx()
+        text = lines[-1][:max(0, width - 10)]
+        screen.move(height - 1, 0)
+        screen.clrtoeol()
+        screen.addstr(height - 1, 0, text)
+        curses.echo()
+        try:
+            curses.curs_set(1)
+        except curses.error:
+            pass
+        raw = screen.getstr(height - 1, len(text), MAX_ANSWER)
+        curses.noecho()
+        try:
+            curses.curs_set(0)
+        except curses.error:
+            pass
+        screen.move(height - 1, 0)
+        screen.clrtoeol()
+        answer = raw.decode('utf-8', 'replace')
+        self.add_log(lines[-1] + answer)
+        return answer
+
+    def close(self):
+        """Restore the terminal and print the final party and log tail there."""
+        if self.screen is None:
+            return
+        self.sync_players()
+        self.draw()
+        curses.nocbreak()
+        curses.echo()
+        curses.endwin()
+        self.screen = None
+        lines = [f"Klara: Welle {self.wave}, Runde {self.round}"]
+        if self.players:
+            lines.append("Party:")
+            for p in self.players:
+                state = f"{p.hp}/{p.max_hp}" if p.is_alive() else "besiegt"
+                lines.append(f" {p.symbol} {p.player_name:<12} {hp_bar(p.hp, p.max_hp)} {state}  {p.role}")
+        lines += list(self.log)[-EXIT_LOG_LINES:]
+        lines.append(f"({self.events:,} Ereignisse, {self.frames:,} Bildschirm-Updates)")
+        print('\n'.join(lines))
+
+
+class CursesIO:
+    """say/ask for game.play on the curses screen. Remembers the answers
+    like replay.RecordingIO, so --record works with --curses."""
+
+    def __init__(self, sink: CursesSink):
+        self.sink = sink
+        self.answers = []
+
+    def say(self, text: str = ""):
+        self.sink.add_log(text)
+
+    def ask(self, prompt: str) -> str:
+        answer = self.sink.ask(prompt)
+        self.answers.append(answer)
+        return answer
+
+
+def start(level: int = ROUND, refresh: float = REFRESH_HZ):
+    """Open the curses screen and return its CursesSink, or None (with a
+    message) if curses or a terminal is missing - then use the console."""
+    if curses is None:
+        print("curses ist nicht installiert (Windows: pip install windows-curses) - normale Textausgabe.")
+        return None
+    if not (sys.stdin.isatty() and sys.stdout.isatty()):
+        print("Keine Konsole (Ein- oder Ausgabe umgeleitet) - normale Textausgabe.")
+        return None
+    locale.setlocale(locale.LC_ALL, '')
+    try:
+        screen = curses.initscr()
+    except curses.error as e:
+        print(f"curses kann das Terminal nicht nutzen ({e}) - normale Textausgabe.")
+        return None
+    curses.noecho()
+    curses.cbreak()
+    try:
+        curses.curs_set(0)
+    except curses.error:
+        pass  # the terminal cannot hide the cursor
+    try:
+        return CursesSink(screen, level, refresh)
+    except Exception:
+        curses.endwin()
+        raise
@@ -0,0 +1,138 @@
+"""
+Structured game events and pluggable event sinks.
+
+The combat loop in game.py does not print anything itself. It emits typed
+events with plain, JSON-friendly data:
+
+  game_start, party, wave_start, round_start, attack, death, round_end,
+  wave_end, drops, craft, game_over
+
+Every event kind has a verbosity level (LEVELS). Callers check
+`sink.wants(level)` before building an event, so a NullSink costs almost
+nothing. The German console text is one renderer (game.ConsoleSink);
+JsonLinesSink writes the same events as JSON lines in batches.
+"""
+import sys
+import json
+
+# verbosity levels
+QUIET = 0    # start and end of the game
+WAVE = 1     # wave start/end, drops, crafting
+ROUND = 2    # round headers, HP and monster status (normal console output)
+ATTACK = 3   # every single attack and death
+
+LEVELS = {
+    'game_start': QUIET, 'party': WAVE, 'wave_start': WAVE, 'round_start': ROUND,
+    'attack': ATTACK, 'death': ATTACK, 'round_end': ROUND, 'wave_end': WAVE,
+    'drops': WAVE, 'craft': WAVE, 'game_over': QUIET,
+}
+
+
+class EventSink:
+    """Base class: collects nothing. Subclasses implement emit()."""
+
+    def __init__(self, level: int = ROUND):
+        self.level = level
+
+    def wants(self, level: int) -> bool:
+        return level <= self.level
+
+    def emit(self, kind: str, **data):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class NullSink(EventSink):
+    """Drops everything - for benchmarks and batch simulations."""
+
+    def __init__(self):
+        super().__init__(level=-1)
+
+
+class BufferedTextSink(EventSink):
+    """Base for text renderers: output is collected and written in batches.
+    Subclasses provide `render_<kind>(**data)` methods returning text."""
+
+    def __init__(self, level: int = ROUND, stream=None, buffer_size: int = 64 * 1024):
+        super().__init__(level)
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self._parts = []
+        self._size = 0
+
+    def emit(self, kind: str, **data):
+        render = getattr(self, 'render_' + kind, None)
+        if render is None:
+            return
+        text = render(**data)
+        if text:
+            self._parts.append(text)
+            self._size += len(text)
+            if self._size >= self.buffer_size:
+                self.flush()
+
+    def flush(self):
+        if self._parts:
+            stream = self.stream or sys.stdout
+            stream.write(''.join(self._parts))
+            stream.flush()
+            self._parts = []
+            self._size = 0
+
+
+class JsonLinesSink(EventSink):
+    """Writes one JSON object per event ({"event": kind, ...data}), batched."""
+
+    def __init__(self, path_or_file, level: int = ATTACK, batch_size: int = 1000):
+        super().__init__(level)
+        if isinstance(path_or_file, str):
+            self._file = open(path_or_file, 'w', encoding='utf-8')
+            self._owns_file = True
+        else:
+            self._file = path_or_file
+            self._owns_file = False
+        self.batch_size = batch_size
+        self._lines = []
+
+    def emit(self, kind: str, **data):
+        data['event'] = kind
+        self._lines.append(json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+        if len(self._lines) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._lines:
+            self._file.write('\n'.join(self._lines) + '\n')
+            self._lines = []
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        if self._owns_file:
+            self._file.close()
+
+
+class MultiSink(EventSink):
+    """Forwards events to several sinks, e.g. console and JSON log."""
+
+    def __init__(self, *sinks):
+        super().__init__(level=max((s.level for s in sinks), default=-1))
+        self.sinks = sinks
+
+    def emit(self, kind: str, **data):
+        for sink in self.sinks:
+            if sink.wants(LEVELS[kind]):
+                sink.emit(kind, **data)
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
@@ -0,0 +1,114 @@
+"""
+Rolling frame and subsystem timings for the in-game overlays (F3).
+
+FrameStats keeps the last `window` frames and reports p50/p95/p99 frame
+times plus the mean time per subsystem. It has the profiler interface
+(phase/add), so it can be passed wherever a profiler goes; times are also
+forwarded to an inner profiler (--profile still works).
+
+  stats = FrameStats(('events', 'render', 'flip'), csv_path='frames.csv')
+  stats.begin_frame()
+  with stats.phase('events'):
+      ...
+  stats.end_frame()
+  stats.lines()    # overlay text
+  stats.close()    # flush the CSV
+
+The CSV has one row per frame: frame number, frame time and one column per
+subsystem, all in milliseconds.
+"""
+import csv
+from collections import deque
+
+from profiler import NULL_PROFILER, NullProfiler, clock
+
+PERCENTILES = (50, 95, 99)
+
+
+class _Timer:
+    __slots__ = ('_stats', '_name', '_start')
+
+    def __init__(self, stats, name: str):
+        self._stats = stats
+        self._name = name
+
+    def __enter__(self):
+        self._start = clock()
+        return self
+
+    def __exit__(self, *exc):
+        self._stats.add(self._name, clock() - self._start)
+        return False
+
+
+def percentile(values, p: float) -> float:
+    """Nearest-rank percentile of a sorted, non-empty sequence."""
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+class FrameStats(NullProfiler):
+    """Frame time and per-subsystem times of the last `window` frames."""
+    enabled = True
+
+    def __init__(self, subsystems, window: int = 300, csv_path=None, prof=NULL_PROFILER):
+        self.subsystems = tuple(subsystems)
+        self.prof = prof
+        self.frames = 0
+        self.frame_ms = deque(maxlen=window)
+        self.subsystem_ms = {name: deque(maxlen=window) for name in self.subsystems}
+        self._current = dict.fromkeys(self.subsystems, 0.0)
+        self._start = None
+        self._file = None
+        if csv_path:
+            self._file = open(csv_path, 'w', newline='', encoding='utf-8')
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(['frame', 'frame_ms'] + [f'{name}_ms' for name in self.subsystems])
+
+    def begin_frame(self):
+        self._start = clock()
+
+    def phase(self, name: str):
+        return _Timer(self, name)
+
+    def add(self, name: str, seconds: float):
+        self._current[name] = self._current.get(name, 0.0) + seconds
+        if self.prof.enabled:
+            self.prof.add(name, seconds)
+
+    def end_frame(self):
+        """Close the frame started by begin_frame() (no-op before the first one)."""
+        if self._start is None:
+            return
+        total = (clock() - self._start) * 1000
+        self.frames += 1
+        self.frame_ms.append(total)
+        row = [self.frames, round(total, 3)]
+        for name in self.subsystems:
+            ms = self._current[name] * 1000
+            self.subsystem_ms[name].append(ms)
+            row.append(round(ms, 3))
+        self._current = dict.fromkeys(self.subsystems, 0.0)
+        if self._file:
+            self._csv.writerow(row)
+
+    def percentiles(self) -> dict:
+        """{50: ms, 95: ms, 99: ms} over the window (empty before the first frame)."""
+        values = sorted(self.frame_ms)
+        return {p: percentile(values, p) for p in PERCENTILES} if values else {}
+
+    def means(self) -> dict:
+        return {name: sum(v) / len(v) if v else 0.0 for name, v in self.subsystem_ms.items()}
+
+    def lines(self):
+        """Overlay text: percentiles, then one line per subsystem."""
+        pct = self.percentiles()
+        if not pct:
+            return ['Frame: -']
+        lines = ['Frame ' + '  '.join(f'p{p} {ms:.1f}' for p, ms in pct.items()) + ' ms']
+        lines += [f'{name:<12}{ms:7.2f} ms' for name, ms in self.means().items()]
+        return lines
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
@@ -1,28 +1,176 @@
+import os
 import sys
+import math
+import atexit
+import heapq
 import random
+from array import array
+from functools import lru_cache
+from collections.abc import MutableMapping
 
+from events import QUIET, WAVE, ROUND, ATTACK, BufferedTextSink, JsonLinesSink, MultiSink, NullSink
+from profiler import NULL_PROFILER, Profiler, clock
 
-class Character:
-    def __init__(self, player_name: str, role: str, hp: int, atk: int, df: int, spd: int, desc: str, symbol: str = "👤", ability: str = "", ability_desc: str = ""):
+
+class EntityStore:
+    """Component arrays for characters and monsters.
+
+    Every entity is an integer id into parallel arrays (hp, max_hp, atk, df,
+    spd, count, alive, one inventory array per MATERIAL_TYPES entry and
+    placed_blocks). Character and Monster are thin views onto one id, so a
+    large simulation costs a few dozen bytes per entity and hot loops can work
+    on the arrays directly. `count` is the number of living members (1 for a
+    single entity, more for a MonsterStack). Ids of dropped views are reused."""
+
+    STATS = ('hp', 'max_hp', 'atk', 'df', 'spd', 'count', 'max_count', 'placed_blocks')
+
+    def __init__(self):
+        for name in self.STATS:
+            setattr(self, name, array('i'))
+        self.alive = bytearray()
+        self.inventory = {m: array('i') for m in MATERIAL_TYPES}
+        self._free = []
+
+    def __len__(self):
+        return len(self.alive) - len(self._free)
+
+    def add(self, hp: int, atk: int, df: int, spd: int, count: int = 1) -> int:
+        if self._free:
+            eid = self._free.pop()
+            self.hp[eid] = self.max_hp[eid] = hp
+            self.atk[eid], self.df[eid], self.spd[eid] = atk, df, spd
+            self.count[eid] = self.max_count[eid] = count
+            self.placed_blocks[eid] = 0
+            for inv in self.inventory.values():
+                inv[eid] = 0
+            self.alive[eid] = hp > 0
+            return eid
+        for name, value in zip(self.STATS, (hp, hp, atk, df, spd, count, count, 0)):
+            getattr(self, name).append(value)
+        for inv in self.inventory.values():
+            inv.append(0)
+        self.alive.append(hp > 0)
+        return len(self.alive) - 1
+
+    def release(self, eid: int):
+        self.alive[eid] = 0
+        self.count[eid] = 0
+        self._free.append(eid)
+
+    def damage(self, eid: int, amount: int):
+        """Damage the front member; when it dies the next one of a stack
+        steps up with full HP."""
+        hp = self.hp[eid] - amount
+        if hp > 0:
+            self.hp[eid] = hp
+            return
+        count = self.count[eid] - 1
+        if count > 0:
+            self.count[eid] = count
+            self.hp[eid] = self.max_hp[eid]
+        else:
+            self.count[eid] = 0
+            self.hp[eid] = 0
+            self.alive[eid] = 0
+
+
+def _component(name: str):
+    def fget(self):
+        return getattr(self._store, name)[self._id]
+
+    def fset(self, value):
+        getattr(self._store, name)[self._id] = value
+    return property(fget, fset)
+
+
+class InventoryView(MutableMapping):
+    """dict-like access to one entity's material counts in the EntityStore."""
+    __slots__ = ('_store', '_id')
+
+    def __init__(self, store, eid: int):
+        self._store = store
+        self._id = eid
+
+    def __getitem__(self, material):
+        return self._store.inventory[material][self._id]
+
+    def __setitem__(self, material, value):
+        self._store.inventory[material][self._id] = value
+
+    def __delitem__(self, material):
+        raise TypeError("Materialien koennen nicht entfernt werden")
+
+    def __iter__(self):
+        return iter(self._store.inventory)
+
+    def __len__(self):
+        return len(self._store.inventory)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class _EntityView:
+    __slots__ = ('_store', '_id')
+
+    def __init__(self, hp: int, atk: int, df: int, spd: int, count: int = 1, store=None):
+        self._store = store if store is not None else STORE
+        self._id = self._store.add(hp, atk, df, spd, count)
+
+    def __del__(self):
+        self._store.release(self._id)
+
+    max_hp = _component('max_hp')
+    atk = _component('atk')
+    df = _component('df')
+    spd = _component('spd')
+    count = _component('count')
+    max_count = _component('max_count')
+    placed_blocks = _component('placed_blocks')
+
+    @property
+    def hp(self):
+        return self._store.hp[self._id]
+
+    @hp.setter
+    def hp(self, value):
+        store, eid = self._store, self._id
+        store.hp[eid] = value
+        store.alive[eid] = value > 0
+        if value <= 0:
+            store.count[eid] = 0
+        elif store.count[eid] == 0:
+            store.count[eid] = 1
+
+    @property
+    def inventory(self):
+        return InventoryView(self._store, self._id)
+
+    @inventory.setter
+    def inventory(self, values):
+        for material in MATERIAL_TYPES:
+            self._store.inventory[material][self._id] = values.get(material, 0)
+
+    def is_alive(self):
+        return self._store.alive[self._id] != 0
+
+    def take_damage(self, amount: int):
+        self._store.damage(self._id, amount)
+
+
+class Character(_EntityView):
+    __slots__ = ('player_name', 'role', 'desc', 'symbol', 'ability', 'ability_desc', 'ability_ready')
+
+    def __init__(self, player_name: str, role: str, hp: int, atk: int, df: int, spd: int, desc: str, symbol: str = "👤", ability: str = "", ability_desc: str = "", store=None):
+        super().__init__(hp, atk, df, spd, store=store)
         self.player_name = player_name
         self.role = role
-        self.max_hp = hp
-        self.hp = hp
-        self.atk = atk
-        self.df = df
-        self.spd = spd
         self.desc = desc
         self.symbol = symbol
         self.ability = ability
         self.ability_desc = ability_desc
         self.ability_ready = True  # Track if ability is ready to use
 
-    def is_alive(self):
-        return self.hp > 0
-
-    def take_damage(self, amount: int):
-        self.hp = max(0, self.hp - amount)
-
     def __str__(self):
         return f"{self.symbol} {self.player_name} ({self.role}) HP:{self.hp}/{self.max_hp} ATK:{self.atk} DEF:{self.df} SPD:{self.spd}"
 
@@ -68,6 +216,29 @@ CHAR_TEMPLATES = {
 
 MATERIAL_TYPES = ["holz", "stein", "gras"]
 
+# crafting: menu key, text for the prompt, cost and effect (atk/df bonus, healing, built blocks)
+RECIPES = {
+    'waffe': {'key': '1', 'label': 'Waffe', 'info': '+2ATK', 'cost': {'holz': 2}, 'atk': 2},
+    'heiltrank': {'key': '2', 'label': 'Heiltrank', 'info': '+30HP', 'cost': {'gras': 1}, 'heal': 30},
+    'schild': {'key': '3', 'label': 'Schild', 'info': '+2DEF', 'cost': {'stein': 2}, 'df': 2},
+    'holzblock': {'key': '4', 'label': 'Holzblock', 'info': '4x4', 'cost': {'holz': 4}, 'blocks': 1},
+}
+CRAFT_KEYS = {r['key']: name for name, r in RECIPES.items()}
+CRAFT_LIMIT = 5  # most items one player crafts after a wave
+
+# default store for all entities that are created without an explicit one
+STORE = EntityStore()
+
+
+def stat_columns(entities, names=EntityStore.STATS):
+    """One array('i') per stat in `names` with the values of `entities` (all
+    views onto one EntityStore), read straight from the store's arrays -
+    much faster than the properties when saving many entities."""
+    entities = list(entities)
+    store = entities[0]._store if entities else STORE
+    ids = [e._id for e in entities]
+    return [array('i', [column[i] for i in ids]) for column in (getattr(store, name) for name in names)]
+
 
 # ASCII Art für Charaktere
 CHARACTER_ASCII = {
@@ -127,43 +298,82 @@ MONSTER_ASCII = {
 }
 
 
-def choose_char(player_name: str) -> Character:
-    print(f"\n{player_name}, wähle deinen Charakter:")
+def make_character(player_name: str, key: str) -> Character:
+    t = CHAR_TEMPLATES[key]
+    return Character(player_name, t['role'], t['hp'], t['atk'], t['df'], t['spd'], t['desc'], t['symbol'], t['ability'], t['ability_desc'])
+
+
+class ConsoleIO:
+    """Interactive prompts on the terminal. Replays (see replay.py) swap this
+    for an object with the same say/ask methods."""
+
+    def say(self, text: str = ""):
+        print(text)
+
+    def ask(self, prompt: str) -> str:
+        return input(prompt)
+
+
+def drive(steps, io):
+    """Run a step generator (play, choose_char_steps) to the end: prompts are
+    answered with io.ask, WaveJobs run right here. Returns the generator's result."""
+    try:
+        step = next(steps)
+        while True:
+            step = steps.send(step.run() if isinstance(step, WaveJob) else io.ask(step))
+    except StopIteration as stop:
+        return stop.value
+
+
+def choose_char(player_name: str, io=None) -> Character:
+    io = io if io is not None else ConsoleIO()
+    return drive(choose_char_steps(player_name, io), io)
+
+
+def choose_char_steps(player_name: str, io):
+    """choose_char as steps: yields the prompt, expects the answer via send()."""
+    io.say(f"\n{player_name}, wähle deinen Charakter:")
     for k, tmpl in CHAR_TEMPLATES.items():
-        print(f"\n{k}. {tmpl['symbol']} {tmpl['role']} - {tmpl['desc']}")
-        print(f"   Lore: {tmpl['lore']}")
-        print(f"   Fähigkeit: {tmpl['ability']} - {tmpl['ability_desc']}")
-        print(f"   Stats: HP {tmpl['hp']}, ATK {tmpl['atk']}, DEF {tmpl['df']}, SPD {tmpl['spd']}")
+        io.say(f"\n{k}. {tmpl['symbol']} {tmpl['role']} - {tmpl['desc']}")
+        io.say(f"   Lore: {tmpl['lore']}")
+        io.say(f"   Fähigkeit: {tmpl['ability']} - {tmpl['ability_desc']}")
+        io.say(f"   Stats: HP {tmpl['hp']}, ATK {tmpl['atk']}, DEF {tmpl['df']}, SPD {tmpl['spd']}")
     while True:
-        choice = input("\nNummer eingeben (1-4): ").strip()
+        choice = (yield "\nNummer eingeben (1-4): ").strip()
         if choice in CHAR_TEMPLATES:
-            t = CHAR_TEMPLATES[choice]
-            return Character(player_name, t['role'], t['hp'], t['atk'], t['df'], t['spd'], t['desc'], t['symbol'], t['ability'], t['ability_desc'])
-        print("Ungültige Wahl. Bitte 1-4 eingeben.")
+            return make_character(player_name, choice)
+        io.say("Ungültige Wahl. Bitte 1-4 eingeben.")
+
 
+class Monster(_EntityView):
+    __slots__ = ('name',)
 
-class Monster:
-    def __init__(self, name: str, hp: int, atk: int, df: int, spd: int):
+    def __init__(self, name: str, hp: int, atk: int, df: int, spd: int, store=None):
+        super().__init__(hp, atk, df, spd, store=store)
         self.name = name
-        self.max_hp = hp
-        self.hp = hp
-        self.atk = atk
-        self.df = df
-        self.spd = spd
 
-    def is_alive(self):
-        return self.hp > 0
+    def __str__(self):
+        return f"{self.name} HP:{self.hp}/{self.max_hp} ATK:{self.atk} DEF:{self.df} SPD:{self.spd}"
 
-    def take_damage(self, amount: int):
-        self.hp = max(0, self.hp - amount)
+
+class MonsterStack(Monster):
+    """`count` identical monsters stored as one record (horde mode).
+    `hp` is the HP of the front monster - the one that gets hit. When it
+    dies the next one steps up with full HP."""
+    __slots__ = ()
+
+    def __init__(self, name: str, hp: int, atk: int, df: int, spd: int, count: int, store=None):
+        _EntityView.__init__(self, hp, atk, df, spd, count, store)
+        self.name = name
 
     def __str__(self):
-        return f"{self.name} HP:{self.hp}/{self.max_hp} ATK:{self.atk} DEF:{self.df} SPD:{self.spd}"
+        return f"{self.count}x {self.name} HP:{self.hp}/{self.max_hp} ATK:{self.atk} DEF:{self.df} SPD:{self.spd}"
 
 
-def generate_wave(wave_number: int):
+def generate_wave(wave_number: int, rng=random):
     """Generate a list of monsters for the given wave number.
-    Waves grow slowly in difficulty. Returns list of Monster objects."""
+    Waves grow slowly in difficulty. Returns list of Monster objects.
+    `rng` is anything with the `random.Random` interface (default: global module)."""
     monsters = []
     # choose a wave composition: mix of weak mobs and a stronger mob sometimes
     if wave_number == 1:
@@ -172,10 +382,10 @@ def generate_wave(wave_number: int):
         count = min(1 + wave_number, 5)
         for i in range(count):
             # scale stats with wave number
-            hp = 30 + wave_number * 8 + random.randint(-5, 5)
-            atk = 5 + wave_number * 2 + random.randint(-1, 2)
+            hp = 30 + wave_number * 8 + rng.randint(-5, 5)
+            atk = 5 + wave_number * 2 + rng.randint(-1, 2)
             df = 2 + wave_number // 2
-            spd = random.randint(3, 7)
+            spd = rng.randint(3, 7)
             monsters.append(Monster(f"Goblin_{i+1}", hp, atk, df, spd))
         # sometimes add a stronger mob
         if wave_number % 3 == 0:
@@ -183,105 +393,359 @@ def generate_wave(wave_number: int):
     return monsters
 
 
-def calculate_damage(attacker_atk: int, defender_df: int):
+def horde_size(wave_number: int) -> int:
+    """Number of goblins in a horde wave: 2, 6, 12, ... 2550 at wave 50."""
+    return wave_number * (wave_number + 1)
+
+
+def generate_horde(wave_number: int, rng=random):
+    """Horde mode: like generate_wave but without the 5-monster cap. Goblins
+    with identical stats are grouped into one MonsterStack, so even waves of
+    thousands stay a list of at most a few hundred stacks."""
+    if wave_number == 1:
+        return [MonsterStack("Goblin", 40, 6, 2, 5, horde_size(1))]
+    groups = {}
+    for _ in range(horde_size(wave_number)):
+        # same stat rolls as generate_wave
+        hp = 30 + wave_number * 8 + rng.randint(-5, 5)
+        atk = 5 + wave_number * 2 + rng.randint(-1, 2)
+        spd = rng.randint(3, 7)
+        groups[(hp, atk, spd)] = groups.get((hp, atk, spd), 0) + 1
+    df = 2 + wave_number // 2
+    monsters = [MonsterStack(f"Goblin_{i+1}", hp, atk, df, spd, n) for i, ((hp, atk, spd), n) in enumerate(groups.items())]
+    if wave_number % 3 == 0:
+        monsters.append(MonsterStack("Ork_Boss", 80 + wave_number * 10, 14 + wave_number * 2, 6 + wave_number // 2, 4, wave_number // 3))
+    return monsters
+
+
+def monster_count(monsters) -> int:
+    """Number of alive monsters, counting every member of a MonsterStack."""
+    return sum(getattr(m, 'count', 1) for m in monsters if m.is_alive())
+
+
+def roll_drops(n: int, rng=random) -> int:
+    """Total of n rolls of randint(0, 2). Large counts use the normal
+    approximation instead of rolling once per monster."""
+    if n <= 64:
+        return sum(rng.randint(0, 2) for _ in range(n))
+    # mean 1 and variance 2/3 per roll
+    total = round(rng.gauss(n, math.sqrt(n * 2 / 3)))
+    return min(2 * n, max(0, total))
+
+
+def calculate_damage(attacker_atk: int, defender_df: int, rng=random):
     base = max(1, attacker_atk - defender_df)
     # small randomness
-    dmg = base + random.randint(0, max(1, base // 2))
+    dmg = base + rng.randint(0, max(1, base // 2))
     return dmg
 
 
-def show_character_art(role: str):
-    """Display ASCII art for a character"""
-    if role in CHARACTER_ASCII:
-        print(CHARACTER_ASCII[role])
-
-
-def show_monster_art(name: str):
-    """Display ASCII art for a monster"""
+def monster_art(name: str) -> str:
+    """ASCII art for a monster"""
     # Get the base name (e.g. "Goblin_1" -> "Goblin")
     base_name = name.split('_')[0]
     if base_name in MONSTER_ASCII:
-        print(MONSTER_ASCII[base_name])
+        return MONSTER_ASCII[base_name]
+    return f"👹 {name} 👹"
+
+
+def display_name(ent) -> str:
+    return ent.player_name if isinstance(ent, Character) else ent.name
+
+
+def monster_info(m) -> dict:
+    """Plain data for events; `count` is only set for a MonsterStack."""
+    info = {'name': m.name, 'hp': m.hp, 'max_hp': m.max_hp, 'atk': m.atk, 'df': m.df, 'spd': m.spd}
+    if isinstance(m, MonsterStack):
+        info['count'] = m.count
+    return info
+
+
+def format_monster(m: dict) -> str:
+    prefix = f"{m['count']}x " if 'count' in m else ""
+    return f"{prefix}{m['name']} HP:{m['hp']}/{m['max_hp']} ATK:{m['atk']} DEF:{m['df']} SPD:{m['spd']}"
+
+
+class ConsoleSink(BufferedTextSink):
+    """The German console output of the game, rendered from events.
+    Output is buffered and written at the start of every wave, at the end of
+    the game and whenever flush() is called (e.g. before asking for input)."""
+
+    def emit(self, kind: str, **data):
+        if kind == 'wave_start':
+            self.flush()
+        super().emit(kind, **data)
+        if kind == 'game_over':
+            self.flush()
+
+    def render_game_start(self, auto, seed):
+        return "Willkommen zum Klara Abenteuer-Spiel!\n>>> MULTIPLAYER KAMPFSPIEL <<<\n\n"
+
+    def render_party(self, players, auto):
+        lines = []
+        if auto:
+            lines.append(f"Demo-Modus: {len(players)} Spieler wurden automatisch erstellt.")
+        lines += ["\n" + "="*60, "=== CHARAKTERE GEWAEHLT ===", "="*60]
+        for p in players:
+            lines.append(f"\n{p['symbol']} {p['name']} als {p['role']}")
+            lines.append(f"   {p['desc']}")
+            lines.append(f"   Faehigkeit: {p['ability']} - {p['ability_desc']}")
+            if p['role'] in CHARACTER_ASCII:
+                lines.append(CHARACTER_ASCII[p['role']])
+        lines.append("="*60)
+        lines.append("\nCharaktere wurden erstellt. Naechster Schritt: Kampfsystem implementieren.")
+        return "\n".join(lines) + "\n"
+
+    def render_wave_start(self, wave, horde, monsters, total):
+        lines = [f"\n{'='*60}", f">>> WELLE {wave} GESTARTET! <<<", f"{'='*60}"]
+        if horde:
+            lines.append(f"\nGegner: {total} Monster in {len(monsters)} Gruppen")
+        else:
+            lines.append(f"\nGegner:")
+        shown = set()
+        for m in monsters:
+            lines.append(f"- {format_monster(m)}")
+            # in horde mode every kind of monster is drawn only once
+            base_name = m['name'].split('_')[0]
+            if not horde or base_name not in shown:
+                lines.append(monster_art(m['name']))
+                shown.add(base_name)
+        lines.append(f"{'='*60}\n")
+        return "\n".join(lines) + "\n"
+
+    def render_round_start(self, wave, round, players):
+        lines = [f"\n-- Runde {round} --"]
+        # show brief status
+        lines += [f"{p['name']}: HP {p['hp']}/{p['max_hp']}" for p in players]
+        return "\n".join(lines) + "\n"
+
+    def render_attack(self, attacker, target, damage, hp):
+        return f"  {attacker} trifft {target}: {damage} Schaden (HP {hp})\n"
+
+    def render_death(self, name, side):
+        return f"  {name} faellt!\n"
+
+    def render_round_end(self, wave, round, monsters=None, remaining=None, groups=None):
+        if monsters is None:
+            return f"Gegner uebrig: {remaining} in {groups} Gruppen\n"
+        return "".join(
+            f"{format_monster(m)}\n" if m['hp'] > 0 else f"{m['name']} besiegt!\n" for m in monsters
+        )
+
+    def render_wave_end(self, wave, won, rounds):
+        if won:
+            return "\nDie Spieler haben die Welle gewonnen!\n"
+        return "\nDie Spieler wurden besiegt...\n"
+
+    def render_drops(self, wave, drops):
+        drops_str = ", ".join(f"{k}: {v}" for k, v in drops.items())
+        return f"Die Spieler sammeln Materialien aus der Welle: {drops_str}.\n"
+
+    def render_craft(self, player, item, auto, hp, max_hp, atk, df, placed_blocks):
+        if auto:
+            texts = {
+                'holzblock': f"{player} baut automatisch einen 4x4 Holzblock. Blöcke: {placed_blocks}.",
+                'waffe': f"{player} baut automatisch eine Waffe (+2 ATK).",
+                'heiltrank': f"{player} nutzt automatisch einen Heiltrank (+30 HP).",
+                'schild': f"{player} baut automatisch ein Schild (+2 DEF).",
+            }
+        else:
+            texts = {
+                'waffe': f"{player} hat eine Waffe gebaut! ATK nun {atk}.",
+                'heiltrank': f"{player} nutzt einen Heiltrank. HP nun {hp}/{max_hp}.",
+                'schild': f"{player} hat ein Schild gebaut! DEF nun {df}.",
+                'holzblock': f"{player} hat einen 4x4 Holzblock gebaut! Blöcke: {placed_blocks}.",
+            }
+        return texts[item] + "\n"
+
+    def render_game_over(self, waves):
+        return "Spiel beendet. Möchtest du es nochmal versuchen? Starte das Programm neu.\n"
+
+
+# default sink: console output, flushed when the program ends
+CONSOLE = ConsoleSink()
+atexit.register(CONSOLE.flush)
+
+
+class TurnScheduler:
+    """Turn order and target lookup for one fight, kept across rounds.
+
+    The turn queue is sorted by speed once (players before monsters on equal
+    speed, like the old per-round sort). For each side a min-heap of
+    (hp, list index, entity id) finds the alive entity with the lowest HP;
+    dead or outdated heap entries are dropped lazily. All damage during the
+    fight must go through `damage()` so the heaps stay up to date.
+    Everything works on entity ids of one shared EntityStore."""
+
+    def __init__(self, players, monsters):
+        self.store = players[0]._store if players else STORE
+        self.entities = {'player': list(players), 'monster': list(monsters)}
+        turns = [(p.spd, 'player', p._id) for p in players if p.is_alive()]
+        turns += [(m.spd, 'monster', m._id) for m in monsters if m.is_alive()]
+        turns.sort(key=lambda x: x[0], reverse=True)
+        self.turns = [(kind, eid) for _, kind, eid in turns]
+        self._index = {}
+        self._heaps = {}
+        for side, ents in self.entities.items():
+            heap = []
+            for i, e in enumerate(ents):
+                if e._store is not self.store:
+                    raise ValueError("Alle Kampfteilnehmer muessen im selben EntityStore liegen")
+                self._index[e._id] = i
+                if e.is_alive():
+                    heap.append((e.hp, i, e._id))
+            heapq.heapify(heap)
+            self._heaps[side] = heap
+
+    def target_id(self, side: str):
+        """Entity id of the alive entity of `side` ('player' or 'monster') with the lowest HP, or None."""
+        heap = self._heaps[side]
+        hp, alive = self.store.hp, self.store.alive
+        while heap:
+            entry_hp, _, eid = heap[0]
+            if entry_hp == hp[eid] and alive[eid]:
+                return eid
+            heapq.heappop(heap)
+        return None
+
+    def target(self, side: str):
+        """Like target_id, but returns the Character/Monster."""
+        eid = self.target_id(side)
+        return None if eid is None else self.entity(side, eid)
+
+    def entity(self, side: str, eid: int):
+        return self.entities[side][self._index[eid]]
+
+    def damage(self, side: str, eid: int, amount: int):
+        store = self.store
+        store.damage(eid, amount)
+        if store.alive[eid]:
+            heapq.heappush(self._heaps[side], (store.hp[eid], self._index[eid], eid))
+
+    def drop_dead(self):
+        """Remove dead entities from the turn queue (done between rounds)."""
+        alive = self.store.alive
+        self.turns = [(kind, eid) for kind, eid in self.turns if alive[eid]]
+
+
+def combat_round(players, monsters, rng=random, scheduler=None, sink=None, prof=None):
+    """Every alive participant acts once, ordered by speed. Returns True if players won.
+    Pass the same TurnScheduler for all rounds of a wave to avoid rebuilding it.
+    attack/death events are only built if `sink` wants ATTACK level events.
+    An enabled `prof` (profiler.Profiler) gets target/damage/output timings and
+    attack/kill counts, summed per round."""
+    if scheduler is None:
+        scheduler = TurnScheduler(players, monsters)
     else:
-        print(f"👹 {name} 👹")
+        scheduler.drop_dead()
 
+    store = scheduler.store
+    alive, atk, df, count = store.alive, store.atk, store.df, store.count
+    log = sink if sink is not None and sink.wants(ATTACK) else None
+    prof = prof if prof is not None else NULL_PROFILER
+    timed = prof.enabled
+    t_target = t_damage = t_output = 0.0
+    attacks = kills = 0
+    try:
+        for kind, eid in scheduler.turns:
+            # a MonsterStack attacks once for every member still alive
+            for _ in range(count[eid]):
+                if not alive[eid]:
+                    break
+                # simple AI for demo: players attack the alive monster with lowest HP,
+                # monsters the alive player with lowest HP
+                side = 'monster' if kind == 'player' else 'player'
+                if timed:
+                    start = clock()
+                target = scheduler.target_id(side)
+                if target is None:
+                    return kind == 'player'
+                members = count[target]
+                if timed:
+                    now = clock()
+                    t_target += now - start
+                    start = now
+                dmg = calculate_damage(atk[eid], df[target], rng)
+                scheduler.damage(side, target, dmg)
+                if timed:
+                    now = clock()
+                    t_damage += now - start
+                    start = now
+                    attacks += 1
+                    kills += count[target] < members
+                if log:
+                    name = display_name(scheduler.entity(side, target))
+                    log.emit('attack', attacker=display_name(scheduler.entity(kind, eid)), target=name,
+                             damage=dmg, hp=store.hp[target])
+                    if count[target] < members:
+                        log.emit('death', name=name, side=side)
+                    if timed:
+                        t_output += clock() - start
 
-def combat_round(players, monsters):
-    """Run turns until one side is all dead. Returns True if players won."""
-    # create turn order by speed (players and monsters mixed)
-    participants = []
-    for p in players:
-        if p.is_alive():
-            participants.append((p.spd, 'player', p))
-    for m in monsters:
-        if m.is_alive():
-            participants.append((m.spd, 'monster', m))
-
-    # sort by speed desc
-    participants.sort(key=lambda x: x[0], reverse=True)
-
-    for _, kind, ent in participants:
-        if kind == 'player':
-            if not ent.is_alive():
-                continue
-            # simple AI for demo: attack the alive monster with lowest HP
-            target = next((mo for mo in sorted(monsters, key=lambda x: x.hp) if mo.is_alive()), None)
-            if not target:
-                return True
-            dmg = calculate_damage(ent.atk, target.df)
-            target.take_damage(dmg)
-        else:  # monster
-            if not ent.is_alive():
-                continue
-            # monster targets a random alive player
-            target = next((pl for pl in sorted(players, key=lambda x: x.hp) if pl.is_alive()), None)
-            if not target:
-                return False
-            dmg = calculate_damage(ent.atk, target.df)
-            target.take_damage(dmg)
-
-    # check end conditions
-    players_alive = any(p.is_alive() for p in players)
-    monsters_alive = any(m.is_alive() for m in monsters)
-    return players_alive and not monsters_alive
+        # check end conditions
+        return scheduler.target_id('player') is not None and scheduler.target_id('monster') is None
+    finally:
+        if timed:
+            prof.add('target', t_target)
+            prof.add('damage', t_damage)
+            if log:
+                prof.add('output', t_output)
+            prof.count('attacks', attacks)
+            prof.count('kills', kills)
 
 
-def run_wave(players, wave_number: int, auto=False):
-    monsters = generate_wave(wave_number)
-    print(f"\n{'='*60}")
-    print(f">>> WELLE {wave_number} GESTARTET! <<<")
-    print(f"{'='*60}")
-    print(f"\nGegner:")
-    for m in monsters:
-        print(f"- {m}")
-        show_monster_art(m.name)
-    print(f"{'='*60}\n")
+def run_wave(players, wave_number: int, auto=False, rng=random, sink=None, stats=None, horde=False, prof=None):
+    """Fight one wave and report it as events to `sink` (default: CONSOLE);
+    pass events.NullSink() for silent batch runs. If `stats` is a dict, the
+    number of rounds fought is stored in stats['rounds'].
+    horde=True uses generate_horde and reports summaries instead of every monster.
+    `prof` (profiler.Profiler) times the phases generate/combat/output/drops."""
+    sink = sink if sink is not None else CONSOLE
+    prof = prof if prof is not None else NULL_PROFILER
+    with prof.phase('generate'):
+        monsters = generate_horde(wave_number, rng) if horde else generate_wave(wave_number, rng)
+    if sink.wants(WAVE):
+        with prof.phase('output'):
+            sink.emit('wave_start', wave=wave_number, horde=horde,
+                      monsters=[monster_info(m) for m in monsters], total=monster_count(monsters))
 
     # combat loop: we will perform repeated rounds until one side falls
     round_no = 1
-    while any(p.is_alive() for p in players) and any(m.is_alive() for m in monsters):
-        print(f"\n-- Runde {round_no} --")
-        # show brief status
-        for p in players:
-            print(f"{p.player_name}: HP {p.hp}/{p.max_hp}")
-        # run one round (each participant acts once ordered by speed)
-        # For demo/auto, we just run the round; for interactive we'd ask players their actions.
-        players_won = combat_round(players, monsters)
-        # print monster statuses
-        for m in monsters:
-            if m.is_alive():
-                print(f"{m}")
-            else:
-                print(f"{m.name} besiegt!")
-        round_no += 1
+    with prof.phase('combat'):
+        scheduler = TurnScheduler(players, monsters)
+        while scheduler.target_id('player') is not None and scheduler.target_id('monster') is not None:
+            if sink.wants(ROUND):
+                with prof.phase('output'):
+                    sink.emit('round_start', wave=wave_number, round=round_no,
+                              players=[{'name': p.player_name, 'hp': p.hp, 'max_hp': p.max_hp} for p in players])
+            # run one round (each participant acts once ordered by speed)
+            # For demo/auto, we just run the round; for interactive we'd ask players their actions.
+            players_won = combat_round(players, monsters, rng, scheduler, sink, prof)
+            if sink.wants(ROUND):
+                with prof.phase('output'):
+                    if horde:
+                        sink.emit('round_end', wave=wave_number, round=round_no, remaining=monster_count(monsters),
+                                  groups=sum(m.is_alive() for m in monsters))
+                    else:
+                        sink.emit('round_end', wave=wave_number, round=round_no,
+                                  monsters=[monster_info(m) for m in monsters])
+            round_no += 1
+    if stats is not None:
+        stats['rounds'] = round_no - 1
+    prof.count('rounds', round_no - 1)
 
     players_alive = any(p.is_alive() for p in players)
+    if sink.wants(WAVE):
+        with prof.phase('output'):
+            sink.emit('wave_end', wave=wave_number, won=players_alive, rounds=round_no - 1)
     if players_alive:
-        print("\nDie Spieler haben die Welle gewonnen!")
         # drop materials by type
-        total_drops = {m: sum(random.randint(0, 2) for _ in monsters) for m in MATERIAL_TYPES}
-        drops_str = ", ".join(f"{k}: {v}" for k, v in total_drops.items())
-        print(f"Die Spieler sammeln Materialien aus der Welle: {drops_str}.")
+        with prof.phase('drops'):
+            defeated = sum(getattr(m, 'max_count', 1) for m in monsters)
+            total_drops = {m: roll_drops(defeated, rng) for m in MATERIAL_TYPES}
+        if sink.wants(WAVE):
+            with prof.phase('output'):
+                sink.emit('drops', wave=wave_number, drops=total_drops)
         # distribute materials evenly among alive players
         alive_players = [pl for pl in players if pl.is_alive()]
         if alive_players:
@@ -291,39 +755,224 @@ def run_wave(players, wave_number: int, auto=False):
                     p.inventory[mat] = p.inventory.get(mat, 0) + per_player
         return True
     else:
-        print("\nDie Spieler wurden besiegt...")
         return False
 
 
-def main(auto=False):
-    print("Willkommen zum Klara Abenteuer-Spiel!")
-    print(">>> MULTIPLAYER KAMPFSPIEL <<<\n")
+def init_materials(players):
+    """Give every player an inventory for all MATERIAL_TYPES and a block counter."""
+    for p in players:
+        # inventory supports many material types
+        p.inventory = {m: getattr(p, 'inventory', {}).get(m, 0) for m in MATERIAL_TYPES}
+        p.placed_blocks = getattr(p, 'placed_blocks', 0)  # track 4x4 wooden blocks built
+
+
+def emit_craft(sink, p, item: str, auto: bool):
+    if sink.wants(WAVE):
+        sink.emit('craft', player=p.player_name, item=item, auto=auto, hp=p.hp, max_hp=p.max_hp,
+                  atk=p.atk, df=p.df, placed_blocks=p.placed_blocks)
+
+
+def can_craft(p, item: str) -> bool:
+    inv = p.inventory
+    return all(inv.get(k, 0) >= v for k, v in RECIPES[item]['cost'].items())
+
+
+def craft(p, item: str, sink=None, auto=False):
+    """Pay for one RECIPES item and apply its effect (check can_craft first)."""
+    recipe = RECIPES[item]
+    inv = p.inventory
+    for k, v in recipe['cost'].items():
+        inv[k] = inv.get(k, 0) - v
+    p.atk += recipe.get('atk', 0)
+    p.df += recipe.get('df', 0)
+    if 'heal' in recipe:
+        p.hp = min(p.max_hp, p.hp + recipe['heal'])
+    p.placed_blocks += recipe.get('blocks', 0)
+    emit_craft(sink if sink is not None else CONSOLE, p, item, auto)
+
+
+def craft_menu() -> str:
+    """'1=Waffe +2ATK kostet holz:2, ...' for the crafting prompt."""
+    return ", ".join(f"{r['key']}={r['label']} {r['info']} kostet " + ", ".join(f"{k}:{v}" for k, v in r['cost'].items())
+                     for r in RECIPES.values())
+
 
-    if auto:
+def wave_threat(wave_number: int):
+    """(atk, df) of a typical monster of the wave: a goblin of generate_wave
+    (and generate_horde) with the mean stat roll."""
+    if wave_number == 1:
+        return 6, 2
+    return 5 + wave_number * 2, 2 + wave_number // 2
+
+
+@lru_cache(maxsize=None)
+def mean_damage(atk: int, df: int) -> float:
+    """Expected calculate_damage(atk, df)."""
+    base = max(1, atk - df)
+    return base + max(1, base // 2) / 2
+
+
+def fighting_strength(hp: int, atk: int, df: int, threat) -> float:
+    """Hits a player survives times the damage per hit, against a monster
+    with `threat` = (atk, df): a cheap measure of how likely the player
+    gets through the next wave."""
+    m_atk, m_df = threat
+    return hp / mean_damage(m_atk, df) * mean_damage(atk, m_df)
+
+
+# RECIPES as (name, cost per MATERIAL_TYPES entry, atk, df, heal) for the planner
+_RECIPE_ROWS = tuple((name, tuple(r['cost'].get(m, 0) for m in MATERIAL_TYPES), r.get('atk', 0), r.get('df', 0),
+                      r.get('heal', 0)) for name, r in RECIPES.items())
+# a plan never uses more of a material than this, so larger amounts are cut for the cache key
+_MAX_USE = tuple(CRAFT_LIMIT * max(cost[i] for _, cost, _, _, _ in _RECIPE_ROWS) for i in range(len(MATERIAL_TYPES)))
+
+
+@lru_cache(maxsize=None)
+def _craft_options(inventory, start: int = 0, left: int = CRAFT_LIMIT):
+    """What `inventory` (amounts in MATERIAL_TYPES order) can buy with at
+    most `left` items of RECIPES[start:], as (atk, df, heal, items) totals.
+    Recipes are only combined in table order (effects commute), and only
+    options no other option beats in atk, df and heal are kept - fewest
+    items first. Depends on the materials only, not on the player."""
+    options = [(0, 0, 0, ())]
+    if left:
+        for i in range(start, len(_RECIPE_ROWS)):
+            name, cost, d_atk, d_df, heal = _RECIPE_ROWS[i]
+            if any(have < need for have, need in zip(inventory, cost)):
+                continue
+            rest = tuple(have - need for have, need in zip(inventory, cost))
+            options += [(atk + d_atk, df + d_df, hp + heal, (name,) + items)
+                        for atk, df, hp, items in _craft_options(rest, i, left - 1)]
+    # any option that beats another in every stat comes before it in this order
+    options.sort(key=lambda o: (-o[0], -o[1], -o[2], len(o[3])))
+    kept = []
+    for o in options:
+        if not any(k[0] >= o[0] and k[1] >= o[1] and k[2] >= o[2] for k in kept):
+            kept.append(o)
+    kept.sort(key=lambda o: len(o[3]))
+    return tuple(kept)
+
+
+@lru_cache(maxsize=None)
+def _best_plan(inventory, hp: int, max_hp: int, atk: int, df: int, wave_number: int):
+    threat = wave_threat(wave_number)
+    best, plan = -1.0, ()
+    for d_atk, d_df, heal, items in _craft_options(inventory):
+        strength = fighting_strength(min(max_hp, hp + heal), atk + d_atk, df + d_df, threat)
+        if strength > best:  # ties: the option with fewer items came first
+            best, plan = strength, items
+    return plan
+
+
+def plan_crafts(p, wave_number: int):
+    """Best crafting plan (tuple of RECIPES names, at most CRAFT_LIMIT) for
+    player `p` before wave `wave_number`: maximizes fighting_strength
+    against that wave. Dynamic programming over the inventory, memoized
+    on the materials and on the whole situation, so batch simulations
+    mostly pay for a cache lookup."""
+    store, i = p._store, p._id
+    inventory = tuple(min(store.inventory[m][i], most) for m, most in zip(MATERIAL_TYPES, _MAX_USE))
+    return _best_plan(inventory, store.hp[i], store.max_hp[i], store.atk[i], store.df[i], wave_number)
+
+
+def auto_craft(players, sink=None, wave_number: int = 1):
+    """Demo auto-crafting: every living player crafts plan_crafts() for the
+    next wave (`wave_number`)."""
+    sink = sink if sink is not None else CONSOLE
+    for p in players:
+        if not p.is_alive():
+            continue
+        for item in plan_crafts(p, wave_number):
+            craft(p, item, sink, auto=True)
+
+
+def arg_value(argv, flag: str, default=None):
+    """Return the value of `--flag VALUE` or `--flag=VALUE` from argv, else default."""
+    for i, arg in enumerate(argv):
+        if arg == flag and i + 1 < len(argv):
+            return argv[i + 1]
+        if arg.startswith(flag + '='):
+            return arg.split('=', 1)[1]
+    return default
+
+
+class WaveJob:
+    """One run_wave call of play(). It is yielded instead of called, so the
+    driver decides where it runs (a server can move large waves to a worker
+    process); send() the result of run() back."""
+    __slots__ = ('players', 'wave', 'auto', 'rng', 'sink', 'stats', 'horde', 'prof')
+
+    def __init__(self, players, wave, auto, rng, sink, stats, horde, prof):
+        self.players, self.wave, self.auto, self.rng = players, wave, auto, rng
+        self.sink, self.stats, self.horde, self.prof = sink, stats, horde, prof
+
+    def monsters(self) -> int:
+        """Number of monsters the wave will have (at least, for boss waves)."""
+        return horde_size(self.wave) if self.horde else min(1 + self.wave, 5)
+
+    def run(self) -> bool:
+        return run_wave(self.players, self.wave, auto=self.auto, rng=self.rng, sink=self.sink,
+                        stats=self.stats, horde=self.horde, prof=self.prof)
+
+
+def main(auto=False, horde=False, sink=None, seed=None, io=None, prof=None, checkpoint=None, resume=None):
+    """Play a full game. All randomness comes from one random.Random(seed), and
+    all player input from `io` (default: ConsoleIO), so a game can be replayed
+    exactly from the seed and the recorded answers. Returns a small summary:
+    seed, waves survived and rounds per wave. `prof` (profiler.Profiler)
+    collects per-wave timings and counters. `checkpoint(players, next_wave,
+    rng, summary)` is called after every won wave (and crafting), e.g. a
+    savegame.GameCheckpoints; `resume` is a loaded checkpoint
+    (savegame.load) to continue from instead of starting at wave 1."""
+    io = io if io is not None else ConsoleIO()
+    return drive(play(auto, horde, sink, seed, io, prof, checkpoint, resume), io)
+
+
+def play(auto=False, horde=False, sink=None, seed=None, io=None, prof=None, checkpoint=None, resume=None):
+    """main() as steps: a generator that yields every prompt (str) and every
+    wave (WaveJob) and expects the answer or run_wave's result via send().
+    io.say is still called directly. Returns the same summary as main()."""
+    sink = sink if sink is not None else CONSOLE
+    prof = prof if prof is not None else NULL_PROFILER
+    io = io if io is not None else ConsoleIO()
+    if resume is not None:
+        seed, auto, horde = resume['seed'], resume['auto'], resume['horde']
+    if seed is None:
+        seed = random.randrange(2**32)
+    rng = random.Random(seed)
+    result = {'seed': seed, 'waves': 0, 'rounds': []}
+    if sink.wants(QUIET):
+        sink.emit('game_start', auto=auto, seed=seed)
+
+    if resume is not None:
+        # continue a checkpoint: same party, random stream and summary
+        players = resume['players']
+        rng.setstate(resume['rng_state'])
+        result['rounds'] = list(resume['rounds'])
+        result['waves'] = resume['wave'] - 1
+    elif auto:
         # Demo-Modus: erstelle automatisch 3 Spieler mit templates
         num_players = 3
         player_names = [f"Spieler{i}" for i in range(1, num_players + 1)]
         demo_keys = ["1", "2", "3"]
-        players = []
-        for n, k in zip(player_names, demo_keys):
-            t = CHAR_TEMPLATES[k]
-            players.append(Character(n, t['role'], t['hp'], t['atk'], t['df'], t['spd'], t['desc'], t['symbol'], t['ability'], t['ability_desc']))
-        print("Demo-Modus: 3 Spieler wurden automatisch erstellt.")
+        players = [make_character(n, k) for n, k in zip(player_names, demo_keys)]
     else:
+        # interactive prompts go straight to the terminal
+        sink.flush()
         # Frage nach Spieleranzahl
         while True:
             try:
-                num_players = int(input("Wie viele Spieler? (2-4): ").strip())
+                num_players = int((yield "Wie viele Spieler? (2-4): ").strip())
                 if 2 <= num_players <= 4:
                     break
             except Exception:
                 pass
-            print("Bitte eine Zahl zwischen 2 und 4 eingeben.")
+            io.say("Bitte eine Zahl zwischen 2 und 4 eingeben.")
 
         # Namen abfragen
         player_names = []
         for i in range(num_players):
-            name = input(f"Name von Spieler {i+1}: ").strip()
+            name = (yield f"Name von Spieler {i+1}: ").strip()
             if not name:
                 name = f"Spieler{i+1}"
             player_names.append(name)
@@ -331,94 +980,149 @@ def main(auto=False):
         # Charakterwahl
         players = []
         for name in player_names:
-            char = choose_char(name)
+            char = yield from choose_char_steps(name, io)
             players.append(char)
 
     # Zeige Zusammenfassung
-    print("\n" + "="*60)
-    print("=== CHARAKTERE GEWAEHLT ===")
-    print("="*60)
-    for p in players:
-        print(f"\n{p.symbol} {p.player_name} als {p.role}")
-        print(f"   {p.desc}")
-        print(f"   Faehigkeit: {p.ability} - {p.ability_desc}")
-        show_character_art(p.role)
-    print("="*60)
-    print("\nCharaktere wurden erstellt. Naechster Schritt: Kampfsystem implementieren.")
+    if sink.wants(WAVE):
+        sink.emit('party', auto=auto, players=[
+            {'name': p.player_name, 'role': p.role, 'symbol': p.symbol, 'desc': p.desc,
+             'ability': p.ability, 'ability_desc': p.ability_desc} for p in players])
 
     # initialize materials for crafting
-    for p in players:
-        # inventory supports many material types
-        p.inventory = {m: getattr(p, 'inventory', {}).get(m, 0) for m in MATERIAL_TYPES}
-        p.placed_blocks = getattr(p, 'placed_blocks', 0)  # track 4x4 wooden blocks built
+    init_materials(players)
 
     # simple game loop: run waves until players die or choose to stop
-    wave = 1
+    wave = resume['wave'] if resume is not None else 1
     while True:
-        ok = run_wave(players, wave, auto=auto)
+        stats = {}
+        prof.begin_wave(wave)
+        with prof.phase('wave'):
+            ok = yield WaveJob(players, wave, auto, rng, sink, stats, horde, prof)
+        result['rounds'].append(stats['rounds'])
         if not ok:
-            print("Spiel beendet. Möchtest du es nochmal versuchen? Starte das Programm neu.")
+            if sink.wants(QUIET):
+                sink.emit('game_over', waves=wave - 1)
             break
         # after wave: allow crafting if interactive
         if not auto:
-            print("\nZwischenstopp: Ihr könnt jetzt Gegenstände bauen (craft) oder weiter (enter).")
+            sink.flush()
+            io.say("\nZwischenstopp: Ihr könnt jetzt Gegenstände bauen (craft) oder weiter (enter).")
             for p in players:
                 if not p.is_alive():
                     continue
                 inv = p.inventory
                 inv_str = ", ".join(f"{k}:{v}" for k, v in inv.items())
-                print(f"{p.player_name} Inventar: {inv_str}")
-                choice = input(f"{p.player_name}: craft? (1=Waffe +2ATK kostet holz:2, 2=Heiltrank +30HP kostet gras:1, 3=Schild +2DEF kostet stein:2, 4=Holzblock 4x4 kostet holz:4, enter=weiter): ").strip()
-                def can_afford(inv, cost):
-                    return all(inv.get(k, 0) >= v for k, v in cost.items())
-                def pay_cost(inv, cost):
-                    for k, v in cost.items():
-                        inv[k] = inv.get(k, 0) - v
-
-                if choice == '1' and can_afford(inv, {'holz': 2}):
-                    p.atk += 2
-                    pay_cost(inv, {'holz': 2})
-                    print(f"{p.player_name} hat eine Waffe gebaut! ATK nun {p.atk}.")
-                elif choice == '2' and can_afford(inv, {'gras': 1}):
-                    p.hp = min(p.max_hp, p.hp + 30)
-                    pay_cost(inv, {'gras': 1})
-                    print(f"{p.player_name} nutzt einen Heiltrank. HP nun {p.hp}/{p.max_hp}.")
-                elif choice == '3' and can_afford(inv, {'stein': 2}):
-                    p.df += 2
-                    pay_cost(inv, {'stein': 2})
-                    print(f"{p.player_name} hat ein Schild gebaut! DEF nun {p.df}.")
-                elif choice == '4' and can_afford(inv, {'holz': 4}):
-                    p.placed_blocks += 1
-                    pay_cost(inv, {'holz': 4})
-                    print(f"{p.player_name} hat einen 4x4 Holzblock gebaut! Blöcke: {p.placed_blocks}.")
-                else:
-                    if choice:
-                        print("Ungültig oder nicht genug Materialien.")
+                io.say(f"{p.player_name} Inventar: {inv_str}")
+                plan = plan_crafts(p, wave + 1)
+                suggestion = " + ".join(RECIPES[item]['label'] for item in plan) or "nichts"
+                choice = (yield f"{p.player_name}: craft? ({craft_menu()}, mehrere z.B. 1 1 3, "
+                                f"p=Vorschlag: {suggestion}, enter=weiter): ").strip()
+                # one answer may name several items ("1 1 3", "113"); p = the planner's suggestion
+                items = []
+                for key in choice.lower().replace(',', '').replace(' ', ''):
+                    items.extend(plan if key == 'p' else [CRAFT_KEYS.get(key)])
+                if len(items) > CRAFT_LIMIT:
+                    io.say(f"Hoechstens {CRAFT_LIMIT} Gegenstaende pro Welle.")
+                    items = items[:CRAFT_LIMIT]
+                for item in items:
+                    if item is None or not can_craft(p, item):
+                        io.say("Ungültig oder nicht genug Materialien.")
+                        break
+                    craft(p, item, sink)
+                sink.flush()
                 # show available blocks
-                print(f"{p.player_name} hat {p.placed_blocks} 4x4 Holzblöcke gebaut.")
+                io.say(f"{p.player_name} hat {p.placed_blocks} 4x4 Holzblöcke gebaut.")
         else:
-            # demo auto-crafting: priority Waffe if possible, else Heiltrank, else Holzblock
-            for p in players:
-                if not p.is_alive():
-                    continue
-                inv = p.inventory
-                if inv.get('holz', 0) >= 4:
-                    p.placed_blocks += 1
-                    inv['holz'] -= 4
-                    print(f"{p.player_name} baut automatisch einen 4x4 Holzblock. Blöcke: {p.placed_blocks}.")
-                elif inv.get('holz', 0) >= 2:
-                    p.atk += 2
-                    inv['holz'] -= 2
-                    print(f"{p.player_name} baut automatisch eine Waffe (+2 ATK).")
-                elif inv.get('gras', 0) >= 1:
-                    p.hp = min(p.max_hp, p.hp + 30)
-                    inv['gras'] -= 1
-                    print(f"{p.player_name} nutzt automatisch einen Heiltrank (+30 HP).")
+            # (interactive crafting is not timed, it mostly waits for input)
+            with prof.phase('crafting'):
+                auto_craft(players, sink, wave + 1)
 
         # prepare for next wave
+        result['waves'] = wave
         wave += 1
+        if checkpoint is not None:
+            checkpoint(players, wave, rng, result)
+    sink.flush()
+    return result
+
+
+def make_sink(argv, console=None):
+    """Event sink from the command line: --quiet, --verbosity N (0-3), --log-json PATH.
+    `console` replaces the ConsoleSink (e.g. a cursesui.CursesSink)."""
+    if '--quiet' in argv:
+        console = NullSink()
+    elif console is None:
+        console = ConsoleSink(level=int(arg_value(argv, '--verbosity', ROUND)))
+    json_path = arg_value(argv, '--log-json')
+    if json_path:
+        return MultiSink(console, JsonLinesSink(json_path))
+    return console
+
+
+def cli(argv=None):
+    """The command line of game.py (see the module docstring)."""
+    argv = sys.argv[1:] if argv is None else argv
+    if "--simulate" in argv:
+        import simulate
+        simulate.main(argv)
+    else:
+        auto = "--auto" in argv
+        horde = "--horde" in argv
+        seed = arg_value(argv, '--seed')
+        seed = int(seed) if seed is not None else None
+        record_path = arg_value(argv, '--record')
+        if record_path:
+            import replay
+        # --profile PATH: per-wave timings/counters as JSON, or folded stacks for *.folded
+        profile_path = arg_value(argv, '--profile')
+        prof = Profiler() if profile_path else None
+        # --checkpoint PATH: save the game after the waves (at most every
+        # --checkpoint-every seconds, 0 = every wave); --resume continues from PATH
+        checkpoint_path = arg_value(argv, '--checkpoint')
+        checkpoint = resume = None
+        if checkpoint_path:
+            import savegame
+            if '--resume' in argv and os.path.exists(checkpoint_path):
+                resume = savegame.load(checkpoint_path, savegame.KIND_GAME)
+                auto, horde = resume['auto'], resume['horde']
+                print(f"Spielstand {checkpoint_path} geladen: weiter mit Welle {resume['wave']} (Seed {resume['seed']})")
+            checkpoint = savegame.GameCheckpoints(
+                checkpoint_path, auto, horde,
+                float(arg_value(argv, '--checkpoint-every', savegame.AUTOSAVE_SECONDS)))
+        # --curses: fixed panels instead of scrolling text, redrawn --refresh times per second
+        ui = None
+        if '--curses' in argv and '--quiet' not in argv:
+            import cursesui
+            ui = cursesui.start(int(arg_value(argv, '--verbosity', ROUND)),
+                                float(arg_value(argv, '--refresh', cursesui.REFRESH_HZ)))
+        if ui:
+            io = ui.io  # records the answers as well
+        else:
+            io = replay.RecordingIO() if record_path else None
+        sink = make_sink(argv, ui)
+        try:
+            if ui:
+                # the curses panels follow the real players of the waves
+                result = drive(ui.watch(play(auto, horde, sink, seed, io, prof, checkpoint, resume)), io)
+            else:
+                result = main(auto=auto, horde=horde, sink=sink, seed=seed, io=io, prof=prof,
+                              checkpoint=checkpoint, resume=resume)
+        finally:
+            sink.close()
+            if checkpoint:
+                checkpoint.close()
+                print(f"Checkpoints: {checkpoint}")
+            if prof:
+                prof.save(profile_path)
+                print(f"Profil gespeichert in {profile_path}")
+        if record_path:
+            replay.save_replay(record_path, replay.make_replay(result, auto, horde, io.answers))
+            print(f"Replay gespeichert in {record_path} (Seed {result['seed']})")
 
 
 if __name__ == "__main__":
-    auto = "--auto" in sys.argv
-    main(auto=auto)
+    # run as the module `game`, not `__main__`: savegame, replay and cursesui
+    # import `game`, and their Character and STORE must be ours
+    import game
+    game.cli()
@@ -1,5 +1,7 @@
+import os
 import sys
 import random
+from collections import deque
 
 try:
     import pygame
@@ -7,15 +9,32 @@ except Exception:
     print("Pygame ist nicht installiert. Bitte installiere es mit:\n  .venv\\Scripts\\python.exe -m pip install pygame")
     raise
 
-from game import Character, Monster, CHAR_TEMPLATES, MATERIAL_TYPES, calculate_damage
+from game import Character, Monster, CHAR_TEMPLATES, MATERIAL_TYPES, calculate_damage, arg_value
+from profiler import NULL_PROFILER, Profiler
+from frametimes import FrameStats
+import savegame
 
-# Simple Pygame prototype for the 10x10 grid game
+# Simple Pygame prototype for the grid game (default 10x10, see configure / --size)
 TILE = 48
 COLS = 10
 ROWS = 10
-WIDTH = TILE * COLS
-HEIGHT = TILE * ROWS + 80  # extra space for HUD
+# the window shows a viewport of at most MAX_VIEW_COLS x MAX_VIEW_ROWS tiles
+MAX_VIEW_COLS = 16
+MAX_VIEW_ROWS = 12
+VIEW_COLS = COLS
+VIEW_ROWS = ROWS
+WIDTH = TILE * VIEW_COLS
+HEIGHT = TILE * VIEW_ROWS + 80  # extra space for HUD
 FPS = 30
+OVERLAY_EVERY = FPS // 3  # the F3 overlay text is re-rendered every OVERLAY_EVERY frames
+CHUNK = 16  # the world is stored and pre-rendered in CHUNK x CHUNK tile chunks
+CHUNK_MARGIN = 1  # chunk surfaces kept around the viewport; the others are dropped
+FIELD_RADIUS = 24  # monsters further away than this (in x or y) do not chase
+MONSTER_STEP_FRAMES = FPS // 2  # monsters move one tile every half second
+
+# tile map values
+EMPTY = 0
+BLOCK = 1
 
 # Colors
 WHITE = (255, 255, 255)
@@ -33,31 +52,201 @@ def make_player(choice_key='1'):
     return Character('Player', t['role'], t['hp'], t['atk'], t['df'], t['spd'], t['desc'], t.get('symbol', ''), t.get('ability', ''), t.get('ability_desc', ''))
 
 
-def spawn_monsters(n=5):
-    monsters = []
+def configure(cols: int, rows: int):
+    """Set the world size (module globals COLS/ROWS) and the viewport/window size."""
+    global COLS, ROWS, VIEW_COLS, VIEW_ROWS, WIDTH, HEIGHT
+    COLS, ROWS = cols, rows
+    VIEW_COLS, VIEW_ROWS = min(cols, MAX_VIEW_COLS), min(rows, MAX_VIEW_ROWS)
+    WIDTH = TILE * VIEW_COLS
+    HEIGHT = TILE * VIEW_ROWS + 80
+
+
+def camera_for(px: int, py: int):
+    """Top-left world tile of the viewport: centered on the player, clamped to the world."""
+    return (min(max(0, px - VIEW_COLS // 2), COLS - VIEW_COLS),
+            min(max(0, py - VIEW_ROWS // 2), ROWS - VIEW_ROWS))
+
+
+class TileMap:
+    """The world as one byte per tile (EMPTY/BLOCK), split into CHUNK x CHUNK
+    chunks. A chunk's bytearray is only allocated when a tile in it is set;
+    untouched chunks read as EMPTY. Index with grid[x, y]."""
+
+    def __init__(self, cols: int, rows: int):
+        self.cols = cols
+        self.rows = rows
+        self.chunks = {}  # (cx, cy) -> bytearray(CHUNK * CHUNK)
+
+    def __getitem__(self, pos):
+        x, y = pos
+        chunk = self.chunks.get((x // CHUNK, y // CHUNK))
+        return chunk[(y % CHUNK) * CHUNK + x % CHUNK] if chunk else EMPTY
+
+    def __setitem__(self, pos, value):
+        x, y = pos
+        key = (x // CHUNK, y // CHUNK)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = bytearray(CHUNK * CHUNK)
+        chunk[(y % CHUNK) * CHUNK + x % CHUNK] = value
+
+    def is_block(self, x: int, y: int) -> bool:
+        return self[x, y] == BLOCK
+
+    def fill(self, x: int, y: int, w: int, h: int, value: int):
+        """Set a w*h rectangle; returns the changed tiles as (x, y) list."""
+        tiles = [(xx, yy) for yy in range(y, y + h) for xx in range(x, x + w)]
+        for pos in tiles:
+            self[pos] = value
+        return tiles
+
+
+class MonsterMap:
+    """All monsters as [monster, x, y] entries plus a spatial hash
+    (x, y) -> entries on that tile, so lookups by tile are O(1).
+    Call move()/remove() when a monster moves or dies."""
+
+    def __init__(self):
+        self.entries = []
+        self.cells = {}
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, m, x: int, y: int):
+        entry = [m, x, y]
+        self.entries.append(entry)
+        self.cells.setdefault((x, y), []).append(entry)
+        return entry
+
+    def _unlink(self, entry):
+        cell = (entry[1], entry[2])
+        here = self.cells[cell]
+        here.remove(entry)
+        if not here:
+            del self.cells[cell]
+
+    def move(self, entry, x: int, y: int):
+        self._unlink(entry)
+        entry[1], entry[2] = x, y
+        self.cells.setdefault((x, y), []).append(entry)
+
+    def remove(self, entry):
+        """Take a dead monster off the map (it stays in entries)."""
+        if entry[0].is_alive():
+            raise ValueError("Nur besiegte Monster koennen entfernt werden")
+        self._unlink(entry)
+
+    def at(self, x: int, y: int):
+        """First alive monster entry on the tile, or None."""
+        for entry in self.cells.get((x, y), ()):
+            if entry[0].is_alive():
+                return entry
+        return None
+
+
+class FlowField:
+    """Shared distance field for chasing monsters: BFS from the player's tile
+    over free (non-BLOCK) tiles, limited to FIELD_RADIUS tiles around the
+    player. Every monster just steps to its neighbour with the smallest
+    distance, so the cost per tick does not depend on the number of monsters.
+    The field is rebuilt lazily: only when the player moved or after
+    mark_dirty() (a block was placed)."""
+
+    def __init__(self, grid, radius: int = FIELD_RADIUS):
+        self.grid = grid
+        self.radius = radius
+        self.dist = {}       # (x, y) -> steps to the player
+        self.origin = None
+        self._dirty = True
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def update(self, px: int, py: int):
+        if not self._dirty and self.origin == (px, py):
+            return
+        grid, r = self.grid, self.radius
+        x0, x1 = max(0, px - r), min(COLS - 1, px + r)
+        y0, y1 = max(0, py - r), min(ROWS - 1, py + r)
+        dist = {(px, py): 0}
+        queue = deque([(px, py)])
+        while queue:
+            x, y = pos = queue.popleft()
+            d = dist[pos] + 1
+            for nx, ny in ((x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)):
+                if x0 <= nx <= x1 and y0 <= ny <= y1 and (nx, ny) not in dist and not grid.is_block(nx, ny):
+                    dist[(nx, ny)] = d
+                    queue.append((nx, ny))
+        self.dist = dist
+        self.origin = (px, py)
+        self._dirty = False
+
+    def next_tile(self, x: int, y: int):
+        """Neighbour one step closer to the player, or None (unreachable or already there)."""
+        dist = self.dist
+        best = dist.get((x, y))
+        if not best:
+            return None
+        step = None
+        for pos in ((x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)):
+            d = dist.get(pos)
+            if d is not None and d < best:
+                best, step = d, pos
+        return step
+
+
+def move_monsters(monsters, field):
+    """One chase step: every alive monster inside the flow field moves one
+    tile towards the player. Returns the number of monsters moved."""
+    cells = monsters.cells
+    # look at whichever is smaller: occupied tiles or the field
+    occupied = [c for c in cells if c in field.dist] if len(cells) < len(field.dist) else [c for c in field.dist if c in cells]
+    moves = []
+    for x, y in occupied:
+        step = field.next_tile(x, y)
+        if step:
+            moves.extend((entry, step) for entry in cells[(x, y)] if entry[0].is_alive())
+    for entry, (x, y) in moves:
+        monsters.move(entry, x, y)
+    return len(moves)
+
+
+def spawn_monsters(n=5, rng=random):
+    monsters = MonsterMap()
     for i in range(n):
-        m = Monster(f'Goblin_{i+1}', 30 + random.randint(0, 10), 6, 2, 4)
+        m = Monster(f'Goblin_{i+1}', 30 + rng.randint(0, 10), 6, 2, 4)
         # choose random pos
-        mx = random.randint(0, COLS - 1)
-        my = random.randint(0, ROWS - 1)
-        monsters.append([m, mx, my])
+        mx = rng.randint(0, COLS - 1)
+        my = rng.randint(0, ROWS - 1)
+        monsters.add(m, mx, my)
     return monsters
 
 
+def draw_tile(screen, grid, x, y, left=0, top=0):
+    # left/top: world tile drawn at the surface origin
+    rect = pygame.Rect((x - left) * TILE, (y - top) * TILE, TILE, TILE)
+    pygame.draw.rect(screen, GRAY if (x + y) % 2 == 0 else WHITE, rect)
+    pygame.draw.rect(screen, BLACK, rect, 1)
+    if grid[x, y] == BLOCK:
+        pygame.draw.rect(screen, BROWN, rect.inflate(-(TILE // 8), -(TILE // 8)))
+
+
 def draw_grid(screen, grid):
     for y in range(ROWS):
         for x in range(COLS):
-            rect = pygame.Rect(x * TILE, y * TILE, TILE, TILE)
-            pygame.draw.rect(screen, GRAY if (x + y) % 2 == 0 else WHITE, rect)
-            pygame.draw.rect(screen, BLACK, rect, 1)
-            if grid[y][x] == 'B':
-                pygame.draw.rect(screen, BROWN, rect.inflate(-6, -6))
+            draw_tile(screen, grid, x, y)
 
 
-def draw_hud(screen, font, player):
-    hud_y = ROWS * TILE + 8
+def draw_hud(screen, font, player, top=None):
+    # top: y of the HUD area (default: below the viewport)
+    top = VIEW_ROWS * TILE if top is None else top
+    hud_y = top + 8
     # background
-    pygame.draw.rect(screen, BLACK, (0, ROWS * TILE, WIDTH, 80))
+    pygame.draw.rect(screen, BLACK, (0, top, WIDTH, 80))
     # HP
     hp_text = font.render(f"HP: {player.hp}/{player.max_hp}", True, WHITE)
     screen.blit(hp_text, (8, hud_y))
@@ -72,24 +261,202 @@ def draw_hud(screen, font, player):
     screen.blit(ctrl_text, (8, hud_y + 50))
 
 
-def find_monster_at(monsters, x, y):
-    for idx, (m, mx, my) in enumerate(monsters):
-        if mx == x and my == y and m.is_alive():
-            return idx, m
-    return None, None
+def draw_monsters(screen, monsters):
+    for m, mx, my in monsters:
+        if m.is_alive():
+            rect = pygame.Rect(mx * TILE, my * TILE, TILE, TILE).inflate(-(TILE // 4), -(TILE // 4))
+            pygame.draw.rect(screen, RED, rect)
+
+
+def hud_key(player):
+    """Everything the HUD shows; the HUD is only re-rendered when this changes."""
+    return (player.hp, player.max_hp, player.atk, player.df, tuple(player.inventory.items()))
+
+
+class Renderer:
+    """Draws the viewport around the player and returns only the screen rects
+    that changed.
+
+    The board (checkerboard + blocks) is pre-rendered per chunk; a chunk
+    surface is created the first time the chunk is in view and afterwards
+    only updated tile by tile via `tiles_changed()`. When the camera moves,
+    the visible chunks are blitted again, and surfaces further than
+    CHUNK_MARGIN chunks from the viewport are dropped, so their memory
+    depends on the window size, not on how much of the world was seen.
+    While the camera stays, units are tracked per tile (tile -> color), and
+    a tile is redrawn when its unit changed. Only the viewport's tiles are
+    looked up in the monster hash, so the cost per frame depends on the
+    window size, not on the world size. The HUD is rendered into its own
+    surface and only re-rendered when hud_key(player) changes. The F3
+    overlay (set_overlay) is blitted on top, again only when it changed or
+    tiles below it were redrawn."""
+
+    def __init__(self, screen, font, grid):
+        self.screen = screen
+        self.font = font
+        self.grid = grid
+        self.chunks = {}         # (cx, cy) -> pre-rendered Surface
+        self.hud = pygame.Surface((WIDTH, 80))
+        self.camera = None       # top-left world tile of the last frame
+        self._hud_key = None
+        self.overlay = None      # F3 frame-time overlay Surface while shown
+        self._overlay_changed = False
+        self._units = {}         # tile -> color drawn in the last frame
+        self._dirty_tiles = set()
+
+    def chunk_surface(self, cx: int, cy: int):
+        surface = self.chunks.get((cx, cy))
+        if surface is None:
+            surface = self.chunks[(cx, cy)] = pygame.Surface((CHUNK * TILE, CHUNK * TILE))
+            left, top = cx * CHUNK, cy * CHUNK
+            for y in range(top, min(top + CHUNK, ROWS)):
+                for x in range(left, min(left + CHUNK, COLS)):
+                    draw_tile(surface, self.grid, x, y, left, top)
+        return surface
+
+    def tiles_changed(self, tiles):
+        """Grid cells changed (e.g. a block was built): redraw them on their chunk."""
+        for x, y in tiles:
+            cx, cy = x // CHUNK, y // CHUNK
+            surface = self.chunks.get((cx, cy))
+            if surface is not None:
+                draw_tile(surface, self.grid, x, y, cx * CHUNK, cy * CHUNK)
+        self._dirty_tiles.update(tiles)
+
+    def draw_board(self, left: int, top: int):
+        """Blit all chunks visible with the camera at (left, top)."""
+        screen = self.screen
+        screen.set_clip(pygame.Rect(0, 0, VIEW_COLS * TILE, VIEW_ROWS * TILE))
+        cx0, cx1 = left // CHUNK, (left + VIEW_COLS - 1) // CHUNK
+        cy0, cy1 = top // CHUNK, (top + VIEW_ROWS - 1) // CHUNK
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                screen.blit(self.chunk_surface(cx, cy), ((cx * CHUNK - left) * TILE, (cy * CHUNK - top) * TILE))
+        screen.set_clip(None)
+        self.chunks = {(cx, cy): surface for (cx, cy), surface in self.chunks.items()
+                       if cx0 - CHUNK_MARGIN <= cx <= cx1 + CHUNK_MARGIN and cy0 - CHUNK_MARGIN <= cy <= cy1 + CHUNK_MARGIN}
+
+    def draw(self, monsters, player, px, py):
+        """Draw the frame; returns the list of changed rects for display.update()."""
+        dirty = self.draw_world(monsters, px, py) + self.draw_status(player)
+        return dirty + self.draw_overlay(dirty)
+
+    def draw_world(self, monsters, px, py):
+        """Draw the viewport (board and units); returns the changed rects."""
+        left, top = camera_for(px, py)
+        cells = monsters.cells
+        units = {}
+        for y in range(top, top + VIEW_ROWS):
+            for x in range(left, left + VIEW_COLS):
+                if (x, y) in cells:
+                    units[(x, y)] = RED
+        units[(px, py)] = BLUE  # the player is drawn on top
+        full = self.camera != (left, top)
+        if full:
+            # first frame or the camera moved: the whole viewport changes
+            self.draw_board(left, top)
+            tiles = units.keys()
+            dirty = [pygame.Rect(0, 0, VIEW_COLS * TILE, VIEW_ROWS * TILE)]
+        else:
+            tiles = self._dirty_tiles
+            tiles.update(t for t, c in units.items() if self._units.get(t) != c)
+            tiles.update(t for t in self._units if t not in units)
+            dirty = []
+        for x, y in tiles:
+            if not (left <= x < left + VIEW_COLS and top <= y < top + VIEW_ROWS):
+                continue
+            rect = pygame.Rect((x - left) * TILE, (y - top) * TILE, TILE, TILE)
+            if not full:
+                source = pygame.Rect((x % CHUNK) * TILE, (y % CHUNK) * TILE, TILE, TILE)
+                self.screen.blit(self.chunk_surface(x // CHUNK, y // CHUNK), rect, source)
+                dirty.append(rect)
+            color = units.get((x, y))
+            if color:
+                pygame.draw.rect(self.screen, color, rect.inflate(-(TILE // 4), -(TILE // 4)))
+        self._units = units
+        self._dirty_tiles = set()
+        self.camera = (left, top)
+        return dirty
+
+    def draw_status(self, player):
+        """Draw the HUD below the viewport if it changed; returns the changed rects."""
+        key = hud_key(player)
+        if key == self._hud_key:
+            return []
+        draw_hud(self.hud, self.font, player, top=0)
+        self._hud_key = key
+        return [self.screen.blit(self.hud, (0, VIEW_ROWS * TILE))]
+
+    def set_overlay(self, lines):
+        """Show `lines` as overlay in the top-left corner, or hide it (None)."""
+        if lines is None:
+            if self.overlay:
+                self.camera = None  # redraw the viewport it covered
+            self.overlay = None
+            return
+        rendered = [self.font.render(line, True, WHITE) for line in lines]
+        width = max(r.get_width() for r in rendered) + 12
+        height = sum(r.get_height() for r in rendered) + 8
+        if self.overlay:
+            # never shrink, so no stale overlay pixels stay on screen
+            width, height = max(width, self.overlay.get_width()), max(height, self.overlay.get_height())
+        self.overlay = pygame.Surface((width, height))
+        y = 4
+        for r in rendered:
+            self.overlay.blit(r, (6, y))
+            y += r.get_height()
+        self._overlay_changed = True
+
+    def draw_overlay(self, dirty):
+        """Blit the overlay if it changed or was drawn over; returns the changed rects."""
+        if not self.overlay:
+            return []
+        rect = self.overlay.get_rect()
+        if not self._overlay_changed and rect.collidelist(dirty) < 0:
+            return []
+        self._overlay_changed = False
+        return [self.screen.blit(self.overlay, rect)]
 
 
 def main():
-    # allow selecting template from argv --player N
-    choice = '1'
-    for arg in sys.argv[1:]:
-        if arg.startswith('--player='):
-            choice = arg.split('=', 1)[1]
-            break
-    player = make_player(choice)
-    # give player a little starting materials so they can build
-    player.inventory = {m: 3 for m in MATERIAL_TYPES}
-    player.placed_blocks = 0
+    # allow selecting template from argv --player=N
+    choice = arg_value(sys.argv, '--player', '1')
+    # --seed=N makes monster positions, damage and drops reproducible
+    seed = arg_value(sys.argv, '--seed')
+    rng = random.Random(int(seed) if seed is not None else None)
+    # --size=N or --size=COLSxROWS, e.g. --size=500
+    size = arg_value(sys.argv, '--size')
+    if size:
+        cols, _, rows = size.lower().partition('x')
+        configure(int(cols), int(rows or cols))
+    # --profile PATH: frame phase timings as JSON, or folded stacks for *.folded
+    profile_path = arg_value(sys.argv, '--profile')
+    prof = Profiler() if profile_path else NULL_PROFILER
+    # frame times (work per frame, without waiting for the next tick) for the
+    # F3 overlay; --frametimes PATH also writes them to a CSV file
+    stats = FrameStats(('events', 'chase', 'grid', 'hud', 'overlay', 'save', 'flip'),
+                       csv_path=arg_value(sys.argv, '--frametimes'), prof=prof)
+    # --checkpoint PATH: autosave the world every --checkpoint-every seconds and
+    # on exit; --resume continues from PATH (world size, blocks, monsters, player)
+    checkpoint_path = arg_value(sys.argv, '--checkpoint')
+    saved = None
+    if checkpoint_path and '--resume' in sys.argv and os.path.exists(checkpoint_path):
+        saved = savegame.load(checkpoint_path, savegame.KIND_WORLD)
+        if saved['chunk_size'] != CHUNK:
+            raise ValueError(f"{checkpoint_path}: Chunkgroesse {saved['chunk_size']} passt nicht (erwartet {CHUNK})")
+        configure(saved['cols'], saved['rows'])
+        player = saved['player']
+        rng.setstate(saved['rng_state'])
+        print(f"Spielstand {checkpoint_path} geladen: {COLS}x{ROWS}, {len(saved['monsters'])} Monster")
+    else:
+        player = make_player(choice)
+        # give player a little starting materials so they can build
+        player.inventory = {m: 3 for m in MATERIAL_TYPES}
+        player.placed_blocks = 0
+    saver = None
+    if checkpoint_path:
+        saver = savegame.Autosaver(checkpoint_path,
+                                   float(arg_value(sys.argv, '--checkpoint-every', savegame.AUTOSAVE_SECONDS)))
 
     pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -97,47 +464,70 @@ def main():
     clock = pygame.time.Clock()
     font = pygame.font.SysFont('Arial', 18)
 
-    grid = [[None for _ in range(COLS)] for _ in range(ROWS)]
-    px, py = COLS // 2, ROWS // 2
-    monsters = spawn_monsters(6)
+    grid = TileMap(COLS, ROWS)
+    if saved:
+        grid.chunks = saved['chunks']
+        px, py = saved['px'], saved['py']
+        monsters = MonsterMap()
+        for m, mx, my in saved['monsters']:
+            monsters.add(m, mx, my)
+    else:
+        px, py = COLS // 2, ROWS // 2
+        monsters = spawn_monsters(int(arg_value(sys.argv, '--monsters', 6)), rng)
+
+    def snapshot():
+        return savegame.encode_world(grid, CHUNK, player, px, py, monsters, rng)
+    renderer = Renderer(screen, font, grid)
+    field = FlowField(grid)
+    frame = 0
 
     running = True
     while running:
         clock.tick(FPS)
-        for event in pygame.event.get():
+        stats.begin_frame()
+        prof.count('frames')
+        with stats.phase('events'):
+            events = pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
+                elif event.key == pygame.K_F3:
+                    renderer.set_overlay(None if renderer.overlay else stats.lines())
                 elif event.key in (pygame.K_w, pygame.K_UP):
                     nx, ny = px, max(0, py - 1)
-                    if grid[ny][nx] != 'B':
+                    if not grid.is_block(nx, ny):
                         px, py = nx, ny
                 elif event.key in (pygame.K_s, pygame.K_DOWN):
                     nx, ny = px, min(ROWS - 1, py + 1)
-                    if grid[ny][nx] != 'B':
+                    if not grid.is_block(nx, ny):
                         px, py = nx, ny
                 elif event.key in (pygame.K_a, pygame.K_LEFT):
                     nx, ny = max(0, px - 1), py
-                    if grid[ny][nx] != 'B':
+                    if not grid.is_block(nx, ny):
                         px, py = nx, ny
                 elif event.key in (pygame.K_d, pygame.K_RIGHT):
                     nx, ny = min(COLS - 1, px + 1), py
-                    if grid[ny][nx] != 'B':
+                    if not grid.is_block(nx, ny):
                         px, py = nx, ny
                 elif event.key == pygame.K_SPACE:
                     # attack current tile
-                    idx, mon = find_monster_at(monsters, px, py)
-                    if mon:
-                        dmg = calculate_damage(player.atk, mon.df)
+                    entry = monsters.at(px, py)
+                    if entry:
+                        mon = entry[0]
+                        dmg = calculate_damage(player.atk, mon.df, rng)
                         mon.take_damage(dmg)
+                        prof.count('attacks')
                         print(f"Du greifst {mon.name} an und verursachst {dmg} Schaden.")
                         if not mon.is_alive():
                             print(f"{mon.name} besiegt!")
+                            prof.count('kills')
+                            monsters.remove(entry)
                             # drops
                             for mtype in MATERIAL_TYPES:
-                                player.inventory[mtype] = player.inventory.get(mtype, 0) + random.randint(0, 2)
+                                player.inventory[mtype] = player.inventory.get(mtype, 0) + rng.randint(0, 2)
                     else:
                         print('Kein Monster hier')
                 elif event.key == pygame.K_b:
@@ -148,30 +538,47 @@ def main():
                     elif px + 4 > COLS or py + 4 > ROWS:
                         print('Kein Platz hier fuer 4x4 Block')
                     else:
-                        for yy in range(py, py + 4):
-                            for xx in range(px, px + 4):
-                                grid[yy][xx] = 'B'
+                        renderer.tiles_changed(grid.fill(px, py, 4, 4, BLOCK))
+                        field.mark_dirty()
                         player.inventory['holz'] -= cost
                         player.placed_blocks += 1
                         print('4x4 Block gebaut')
 
-        # Render
-        screen.fill(BLACK)
-        draw_grid(screen, grid)
-        # draw monsters
-        for m, mx, my in monsters:
-            if m.is_alive():
-                rect = pygame.Rect(mx * TILE + 6, my * TILE + 6, TILE - 12, TILE - 12)
-                pygame.draw.rect(screen, RED, rect)
-        # draw player
-        prect = pygame.Rect(px * TILE + 6, py * TILE + 6, TILE - 12, TILE - 12)
-        pygame.draw.rect(screen, BLUE, prect)
+        # monsters chase the player around the blocks
+        frame += 1
+        if frame % MONSTER_STEP_FRAMES == 0:
+            with stats.phase('chase'):
+                field.update(px, py)
+                prof.count('monster_moves', move_monsters(monsters, field))
 
-        draw_hud(screen, font, player)
+        # autosave: the snapshot is taken here, compressing and writing run on a thread
+        if saver and saver.due():
+            with stats.phase('save'):
+                saver.save(savegame.KIND_WORLD, snapshot())
 
-        pygame.display.flip()
+        # Render: only the changed parts of the screen are drawn and sent to the display
+        with stats.phase('grid'):
+            dirty = renderer.draw_world(monsters, px, py)
+        with stats.phase('hud'):
+            dirty += renderer.draw_status(player)
+        with stats.phase('overlay'):
+            if renderer.overlay and frame % OVERLAY_EVERY == 0:
+                renderer.set_overlay(stats.lines())
+            dirty += renderer.draw_overlay(dirty)
+        with stats.phase('flip'):
+            if dirty:
+                pygame.display.update(dirty)
+        stats.end_frame()
 
     pygame.quit()
+    stats.close()
+    if saver:
+        saver.save(savegame.KIND_WORLD, snapshot())
+        saver.close()
+        print(f"Gespeichert: {saver}")
+    if profile_path:
+        prof.save(profile_path)
+        print(f"Profil gespeichert in {profile_path}")
 
 
 if __name__ == '__main__':
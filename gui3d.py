@@ -1,7 +1,14 @@
 from ursina import *
 from ursina.prefabs.first_person_controller import FirstPersonController
+import os
+import sys
+import atexit
 import random
 
+from game import arg_value
+from sim3d import World, GRID_SIZE, ENEMY_CAP, PROJECTILE_CAP
+from frametimes import FrameStats
+
 """
 Enhanced 3D prototype using Ursina.
 
@@ -10,115 +17,255 @@ New features:
 - HUD showing simple inventory (wood)
 - Simple enemies that walk toward the player
 - Projectiles that can hit enemies and drop wood
-- Block placement that consumes wood
+- Block placement that consumes wood (blocks stack; right click removes the top one)
+
+The game itself runs in sim3d.World with a fixed timestep; this file reads
+its state, interpolates positions between ticks and turns spawns, kills and
+block changes into entities. `--seed N` replays the same enemy spawns.
+Far enemies move less often when enemy movement would take longer than
+`--enemy-budget MS` per tick (default ENEMY_BUDGET_MS, 0 = always all).
+F3 shows frame times and the time per subsystem; `--frametimes PATH`
+records them to a CSV file.
 
 Run after `pip install ursina` in the project venv.
 """
 
-app = Ursina()
+# window type can be overridden for headless runs (benchmarks, CI): 'offscreen' or 'none'
+app = Ursina(window_type=os.environ.get('URSINA_WINDOW_TYPE', 'onscreen'))
 
 # Ground
 ground = Entity(model='plane', scale=(20, 1, 20), texture='white_cube', texture_scale=(10,10), collider='box', color=color.light_gray)
 
-# Draw grid lines for visual aid
-grid_parent = Entity()
-GRID_SIZE = 10
-for x in range(-GRID_SIZE, GRID_SIZE+1):
-    Entity(parent=grid_parent, model='cube', scale=(0.03, 0.02, GRID_SIZE*2), position=(x, 0.02, 0), color=color.gray)
-for z in range(-GRID_SIZE, GRID_SIZE+1):
-    Entity(parent=grid_parent, model='cube', scale=(GRID_SIZE*2, 0.02, 0.03), position=(0, 0.02, z), color=color.gray)
+# unit cube triangles grouped by face direction, e.g. (0, 1, 0) = top
+CUBE = load_model('cube', use_deepcopy=True)
+CUBE_FACES = {}
+for i in range(0, len(CUBE.vertices), 3):
+    direction = tuple(round(c) for c in CUBE.normals[i])
+    CUBE_FACES.setdefault(direction, []).extend(zip(CUBE.vertices[i:i+3], CUBE.normals[i:i+3], CUBE.uvs[i:i+3]))
+
+def box_mesh(boxes):
+    # one mesh for many axis-aligned boxes ((x, y, z) center, (sx, sy, sz) scale,
+    # face directions to draw): one draw call instead of one entity per box
+    verts, norms, uvs = [], [], []
+    for (x, y, z), (sx, sy, sz), faces in boxes:
+        for d in faces:
+            for v, n, uv in CUBE_FACES[d]:
+                verts.append((x + v[0] * sx, y + v[1] * sy, z + v[2] * sz))
+                norms.append(n)
+                uvs.append(uv)
+    return Mesh(vertices=verts, normals=norms, uvs=uvs, mode='triangle')
+
+# Draw grid lines for visual aid (all lines in one combined mesh)
+grid_lines = [((x, 0.02, 0), (0.03, 0.02, GRID_SIZE*2), CUBE_FACES) for x in range(-GRID_SIZE, GRID_SIZE+1)]
+grid_lines += [((0, 0.02, z), (GRID_SIZE*2, 0.02, 0.03), CUBE_FACES) for z in range(-GRID_SIZE, GRID_SIZE+1)]
+grid_parent = Entity(model=box_mesh(grid_lines), color=color.gray)
 
 # Player (use FirstPersonController for quick movement/looking)
 player = FirstPersonController()
 player.cursor = Entity(parent=camera.ui, model='quad', scale=0.01, color=color.white)
 
-# Inventory and parents
-player_inventory = {'holz': 0}
+# Game state lives in the headless simulation (sim3d.World); this file only draws it
+ENEMY_BUDGET_MS = 2.0
+enemy_budget = float(arg_value(sys.argv, '--enemy-budget', ENEMY_BUDGET_MS))
+world = World(int(arg_value(sys.argv, '--seed', random.randrange(2**32))), enemy_budget if enemy_budget > 0 else None)
 blocks_parent = Entity()
+# placed blocks are batched per BLOCK_CHUNK x BLOCK_CHUNK columns into one mesh + mesh collider
+BLOCK_CHUNK = 8
+block_chunks = {}
 enemies_parent = Entity()
 projectiles_parent = Entity()
+pool_parent = Entity(enabled=False)  # free pooled entities are parked here
+
+class EntityPool:
+    """Reuses entities instead of creating and destroying them. Free entities
+    are parked under the disabled pool_parent (hidden, no collisions), so
+    `parent.children` only holds the active ones. Grows on demand up to `cap`
+    entities."""
+
+    def __init__(self, name, parent, make, size=0, cap=1000):
+        self.name = name
+        self.parent = parent
+        self.make = make
+        self.cap = cap
+        self.free = []
+        self.created = 0
+        self.reused = 0
+        self.refused = 0
+        self.in_use = 0
+        self.peak = 0
+        for _ in range(size):
+            self.free.append(self._new())
+
+    def _new(self):
+        e = self.make()
+        e.parent = pool_parent
+        self.created += 1
+        return e
+
+    def acquire(self):
+        # returns an enabled entity under `parent`, or None if the cap is reached
+        if self.free:
+            e = self.free.pop()
+            self.reused += 1
+        elif self.created < self.cap:
+            e = self._new()
+        else:
+            self.refused += 1
+            return None
+        e.parent = self.parent
+        self.in_use += 1
+        self.peak = max(self.peak, self.in_use)
+        return e
+
+    def release(self, e):
+        e.parent = pool_parent
+        self.free.append(e)
+        self.in_use -= 1
+
+    def stats(self):
+        return {'in_use': self.in_use, 'peak': self.peak, 'created': self.created, 'reused': self.reused,
+                'refused': self.refused, 'cap': self.cap}
+
+    def __str__(self):
+        return (f"{self.name}: {self.in_use}/{self.cap} aktiv (Spitze {self.peak}, erzeugt {self.created}, "
+                f"wiederverwendet {self.reused}, abgelehnt {self.refused})")
+
+# pool sizes: pre-allocated entities; the upper limits are the simulation's caps
+PROJECTILE_POOL_SIZE = 64
+ENEMY_POOL_SIZE = 32
+projectile_pool = EntityPool('Projektile', projectiles_parent,
+                             lambda: Entity(model='sphere', color=color.red, scale=0.15),
+                             PROJECTILE_POOL_SIZE, PROJECTILE_CAP)
+enemy_pool = EntityPool('Gegner', enemies_parent,
+                        lambda: Entity(model='cube', color=color.green, scale=0.9, collider='box'),
+                        ENEMY_POOL_SIZE, ENEMY_CAP)
+# simulation id -> entity drawing it
+enemy_entities = {}
+projectile_entities = {}
 
 # HUD
 hud_text = Text(text='', position=Vec2(-0.95, 0.45), scale=1.1, origin=(0,0))
-controls_text = Text(text='WASD/mouse: Move  •  Left click: Attack  •  B: Build block (cost 1 Holz)', position=Vec2(-0.6, 0.41), scale=0.9, origin=(0,0))
+controls_text = Text(text='WASD/mouse: Move  •  Left click: Attack  •  B: Build block (cost 1 Holz)  •  Right click: Remove block', position=Vec2(-0.6, 0.41), scale=0.9, origin=(0,0))
+
+# F3 overlay: frame times (time between two updates, rendering included) and subsystems
+OVERLAY_EVERY = 10  # frames between overlay text updates
+stats = FrameStats(('projectiles', 'enemies', 'spawning', 'sync'), csv_path=arg_value(sys.argv, '--frametimes'))
+world.prof = stats
+overlay_text = Text(text='', position=Vec2(0.3, 0.45), scale=0.9, origin=(-0.5, 0.5), background=True, enabled=False)
 
 def update_hud():
-    hud_text.text = f'Holz: {player_inventory.get("holz",0)}'
+    hud_text.text = f'Holz: {world.inventory.get("holz",0)}'
 
 update_hud()
 
-def place_block():
-    cost = 1
-    if player_inventory.get('holz',0) < cost:
+def visible_faces(x, level, z):
+    # faces not covered by a neighbouring block or the ground
+    return [d for d in CUBE_FACES
+            if (x + d[0], level + d[1], z + d[2]) not in world.blocks and not (level == 0 and d[1] < 0)]
+
+def rebuild_chunk(chunk):
+    # one combined mesh and collider for all blocks of the chunk
+    if not chunk.cells:
+        del block_chunks[chunk.key]
+        destroy(chunk)
         return
-    p = player.position + player.forward * 2
-    pos = (round(p.x), 0.5, round(p.z))
-    # Don't place if a block exists
-    for b in blocks_parent.children:
-        if (round(b.x), round(b.y), round(b.z)) == (pos[0], pos[1], pos[2]):
-            return
-    player_inventory['holz'] -= cost
-    Entity(parent=blocks_parent, model='cube', color=color.rgb(140,100,40), position=pos, scale=Vec3(1,1,1), collider='box')
-    update_hud()
-
-def spawn_enemy():
-    # spawn at random edge
-    choices = [(-GRID_SIZE,0,random.randint(-GRID_SIZE,GRID_SIZE)), (GRID_SIZE,0,random.randint(-GRID_SIZE,GRID_SIZE)), (random.randint(-GRID_SIZE,GRID_SIZE),0,-GRID_SIZE), (random.randint(-GRID_SIZE,GRID_SIZE),0,GRID_SIZE)]
-    x,y,z = random.choice(choices)
-    e = Entity(parent=enemies_parent, model='cube', color=color.green, scale=0.9, position=(x,0.5,z), collider='box')
-    e.health = 1
-
-def fire_projectile():
-    proj = Entity(parent=projectiles_parent, model='sphere', color=color.red, scale=0.15, position=player.position + player.forward * 1.5)
-    proj.direction = player.forward
-    proj.speed = 18
-    proj.lifetime = 1.0
-
-def handle_projectiles(dt):
-    for proj in list(projectiles_parent.children):
-        proj.position += proj.direction * proj.speed * dt
-        proj.lifetime -= dt
-        # collision check with enemies
-        for e in list(enemies_parent.children):
-            if distance(proj.position, e.position) < 0.9:
-                # enemy dies, drop wood
-                player_inventory['holz'] = player_inventory.get('holz',0) + 1
-                destroy(e)
-                destroy(proj)
-                update_hud()
-                break
-        else:
-            if proj.lifetime <= 0:
-                destroy(proj)
+    chunk.model = box_mesh([((x, level + 0.5, z), (1, 1, 1), visible_faces(x, level, z)) for x, level, z in chunk.cells])
+    chunk.collider = 'mesh'
+
+def rebuild_around(x, z):
+    # a changed block can hide or uncover faces in the neighbouring chunks
+    keys = {((x + dx) // BLOCK_CHUNK, (z + dz) // BLOCK_CHUNK) for dx, dz in ((0, 0), (1, 0), (-1, 0), (0, 1), (0, -1))}
+    for key in keys:
+        if key in block_chunks:
+            rebuild_chunk(block_chunks[key])
+
+def block_placed(cell):
+    x, level, z = cell
+    key = (x // BLOCK_CHUNK, z // BLOCK_CHUNK)
+    chunk = block_chunks.get(key)
+    if chunk is None:
+        chunk = block_chunks[key] = Entity(parent=blocks_parent, color=color.rgb(140,100,40))
+        chunk.key = key
+        chunk.cells = set()
+    chunk.cells.add(cell)
+    rebuild_around(x, z)
+
+def block_removed(cell):
+    x, level, z = cell
+    block_chunks[(x // BLOCK_CHUNK, z // BLOCK_CHUNK)].cells.discard(cell)
+    rebuild_around(x, z)
+
+def sync_events():
+    # mirror spawns, kills and block changes of the simulation into entities
+    for event in world.pop_events():
+        kind = event[0]
+        if kind == 'enemy_spawned':
+            e = enemy_pool.acquire()
+            if e is not None:
+                enemy_entities[event[1].id] = e
+        elif kind == 'enemy_killed':
+            e = enemy_entities.pop(event[1].id, None)
+            if e is not None:
+                enemy_pool.release(e)
+        elif kind == 'projectile_fired':
+            e = projectile_pool.acquire()
+            if e is not None:
+                projectile_entities[event[1].id] = e
+        elif kind == 'projectile_removed':
+            e = projectile_entities.pop(event[1].id, None)
+            if e is not None:
+                projectile_pool.release(e)
+        elif kind == 'block_placed':
+            block_placed(event[1])
+        elif kind == 'block_removed':
+            block_removed(event[1])
+        elif kind == 'inventory':
+            update_hud()
 
-def handle_enemies(dt):
-    for e in list(enemies_parent.children):
-        # move toward player on XZ plane
-        dir = Vec3(player.x - e.x, 0, player.z - e.z)
-        if dir.length() > 0.2:
-            e.position += dir.normalized() * dt * 1.2
-        # optional: if enemy reaches player, we could reduce health (not implemented)
+def interpolate(alpha):
+    # draw every object between its last two simulated positions
+    for e in world.enemies:
+        entity = enemy_entities.get(e.id)
+        if entity is not None:
+            entity.position = (e.prev_x + (e.x - e.prev_x) * alpha, e.y, e.prev_z + (e.z - e.prev_z) * alpha)
+    for p in world.projectiles:
+        entity = projectile_entities.get(p.id)
+        if entity is not None:
+            entity.position = (p.prev_x + (p.x - p.prev_x) * alpha, p.prev_y + (p.y - p.prev_y) * alpha,
+                               p.prev_z + (p.z - p.prev_z) * alpha)
 
-enemy_spawn_timer = 0.0
+def set_player():
+    f = player.forward
+    world.set_player((player.x, player.y, player.z), (f.x, f.y, f.z))
 
 def update():
-    global enemy_spawn_timer
-    dt = time.dt
-    handle_projectiles(dt)
-    handle_enemies(dt)
-    enemy_spawn_timer -= dt
-    if enemy_spawn_timer <= 0:
-        spawn_enemy()
-        enemy_spawn_timer = max(1.8, 3.0 + random.uniform(-1,1))
+    stats.end_frame()
+    stats.begin_frame()
+    set_player()
+    alpha = world.advance(time.dt)
+    with stats.phase('sync'):
+        sync_events()
+        interpolate(alpha)
+    if overlay_text.enabled and stats.frames % OVERLAY_EVERY == 0:
+        overlay_text.text = '\n'.join(stats.lines())
 
 def input(key):
+    set_player()
     if key == 'b':
-        place_block()
+        world.place_block()
     if key == 'left mouse down':
-        fire_projectile()
+        world.fire()
+    if key == 'right mouse down':
+        world.remove_block()
+    if key == 'f3':
+        overlay_text.enabled = not overlay_text.enabled
+        overlay_text.text = '\n'.join(stats.lines())
+    sync_events()
 
 if __name__ == '__main__':
+    atexit.register(lambda: print(f"Pools: {projectile_pool}; {enemy_pool}; Gegner-Scheibe {world.far_slice}"))
+    atexit.register(stats.close)
     # spawn a few enemies to start
     for _ in range(2):
-        spawn_enemy()
+        world.spawn_enemy()
     app.run()
@@ -0,0 +1,107 @@
+"""
+Load generator for server.py: plays many interactive games at once over the
+socket and measures how the server keeps up.
+
+  python server.py --seed 1 &
+  python loadgen.py --sessions 1000 --concurrency 200
+  python loadgen.py --unix /tmp/klara.sock --seed 3
+
+The answers are random but valid (player count, roles, crafting), drawn
+from --seed. Reports finished sessions per second and the response latency
+(answer sent -> next prompt or end of game received) as p50/p95/p99.
+"""
+import sys
+import time
+import random
+import asyncio
+
+from game import arg_value
+from frametimes import percentile
+from server import HOST, PORT, PROMPT_END
+
+STREAM_LIMIT = 16 * 1024 * 1024  # a horde wave can print a lot before the next prompt
+
+
+def answer(prompt: str, rng) -> str:
+    if '(2-4)' in prompt:
+        return str(rng.randint(2, 4))
+    if 'Nummer eingeben' in prompt:
+        return str(rng.randint(1, 4))
+    if 'craft?' in prompt:
+        return rng.choice(['', '1', '2', '3', '4'])
+    return ''  # names: the server picks "SpielerN"
+
+
+async def play_session(connect, rng, latencies) -> int:
+    """One game until the server closes the connection; returns the number of prompts."""
+    reader, writer = await connect()
+    prompts = 0
+    try:
+        data = await reader.readuntil(PROMPT_END)
+        while True:
+            prompts += 1
+            writer.write((answer(data.decode('utf-8', 'replace'), rng) + '\n').encode())
+            start = time.perf_counter()
+            try:
+                data = await reader.readuntil(PROMPT_END)
+            except asyncio.IncompleteReadError:
+                latencies.append(time.perf_counter() - start)  # game over, connection closed
+                return prompts
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run_load(connect, sessions: int, concurrency: int, seed: int = 0) -> dict:
+    latencies = []
+    errors = 0
+    prompts = 0
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(n: int):
+        nonlocal errors, prompts
+        async with limit:
+            try:
+                answered = await play_session(connect, random.Random(seed * 1_000_003 + n), latencies)
+                prompts += answered
+            except (OSError, asyncio.LimitOverrunError, asyncio.IncompleteReadError):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(sessions)))
+    elapsed = time.perf_counter() - start
+    values = sorted(latencies)
+    return {
+        'sessions': sessions - errors, 'errors': errors, 'prompts': prompts, 'seconds': elapsed,
+        'latency_ms': {p: percentile(values, p) * 1000 for p in (50, 95, 99)} if values else {},
+    }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    sessions = int(arg_value(argv, '--sessions', 500))
+    concurrency = int(arg_value(argv, '--concurrency', 100))
+    seed = int(arg_value(argv, '--seed', 0))
+    unix = arg_value(argv, '--unix')
+    if unix:
+        def connect():
+            return asyncio.open_unix_connection(unix, limit=STREAM_LIMIT)
+        where = unix
+    else:
+        host, port = arg_value(argv, '--host', HOST), int(arg_value(argv, '--port', PORT))
+
+        def connect():
+            return asyncio.open_connection(host, port, limit=STREAM_LIMIT)
+        where = f"{host}:{port}"
+    print(f"Last auf {where}: {sessions} Sitzungen, {concurrency} gleichzeitig")
+    r = asyncio.run(run_load(connect, sessions, concurrency, seed))
+    lat = r['latency_ms']
+    print(f"{r['sessions']} Sitzungen in {r['seconds']:.2f}s ({r['sessions'] / r['seconds']:,.1f} Sitzungen/s), "
+          f"{r['prompts']} Antworten, {r['errors']} Fehler")
+    if lat:
+        print(f"Antwortzeit: p50 {lat[50]:.2f} ms, p95 {lat[95]:.2f} ms, p99 {lat[99]:.2f} ms")
+    sys.exit(1 if r['errors'] else 0)
+
+
+if __name__ == "__main__":
+    main()
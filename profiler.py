@@ -0,0 +1,149 @@
+"""
+Named timers and counters for the game loops.
+
+game.py and gui.py take a profiler argument (default: NULL_PROFILER). Hot
+loops check `prof.enabled` once and only then read the clock, so a disabled
+profiler costs one attribute lookup per round or frame.
+
+  prof = Profiler()
+  prof.begin_wave(3)
+  with prof.phase('combat'):
+      with prof.phase('target'):
+          ...
+  prof.count('attacks', 12)
+  prof.save('profile.json')     # per-wave timings and counters
+  prof.save('profile.folded')   # flamegraph.pl / speedscope input
+
+Timings are stored per wave and per phase path ("wave;combat;target"), in
+seconds. Phases can nest; `add()` books time measured by the caller (for
+per-attack timers summed up in a local variable) under the current phase.
+"""
+import json
+import time
+
+clock = time.perf_counter
+
+
+class _Phase:
+    __slots__ = ('_prof', '_name', '_start')
+
+    def __init__(self, prof, name: str):
+        self._prof = prof
+        self._name = name
+
+    def __enter__(self):
+        self._prof._stack.append(self._name)
+        self._start = clock()
+        return self
+
+    def __exit__(self, *exc):
+        prof = self._prof
+        prof._add(';'.join(prof._stack), clock() - self._start)
+        prof._stack.pop()
+        return False
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class NullProfiler:
+    """Disabled profiler: every call is a no-op."""
+    enabled = False
+
+    def begin_wave(self, wave):
+        pass
+
+    def phase(self, name: str):
+        return _NULL_PHASE
+
+    def add(self, name: str, seconds: float):
+        pass
+
+    def count(self, name: str, n: int = 1):
+        pass
+
+    def save(self, path: str):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def _new_record(wave):
+    return {'wave': wave, 'times': {}, 'counts': {}}
+
+
+class Profiler(NullProfiler):
+    """Collects timings (per phase path) and counters, grouped by wave.
+    Anything recorded before the first begin_wave() goes to wave None."""
+    enabled = True
+
+    def __init__(self):
+        self.waves = []
+        self._current = None
+        self._stack = []
+
+    def _record(self):
+        if self._current is None:
+            self._current = _new_record(None)
+            self.waves.append(self._current)
+        return self._current
+
+    def _add(self, path: str, seconds: float):
+        times = self._record()['times']
+        times[path] = times.get(path, 0.0) + seconds
+
+    def begin_wave(self, wave):
+        self._current = _new_record(wave)
+        self.waves.append(self._current)
+
+    def phase(self, name: str):
+        return _Phase(self, name)
+
+    def add(self, name: str, seconds: float):
+        self._add(';'.join(self._stack + [name]), seconds)
+
+    def count(self, name: str, n: int = 1):
+        counts = self._record()['counts']
+        counts[name] = counts.get(name, 0) + n
+
+    def totals(self) -> dict:
+        """All waves summed up: {'times': {path: s}, 'counts': {name: n}}."""
+        total = {'times': {}, 'counts': {}}
+        for rec in self.waves:
+            for key in ('times', 'counts'):
+                for name, value in rec[key].items():
+                    total[key][name] = total[key].get(name, 0) + value
+        return total
+
+    def to_dict(self) -> dict:
+        return {'total': self.totals(), 'waves': self.waves}
+
+    def folded(self) -> str:
+        """Flamegraph "folded stacks": one `a;b;c <microseconds>` line per
+        phase path with its self time (inclusive time minus its children)."""
+        times = self.totals()['times']
+        self_time = dict(times)
+        for path, seconds in times.items():
+            parent = path.rpartition(';')[0]
+            if parent in self_time:
+                self_time[parent] -= seconds
+        return ''.join(f"{path} {max(0, round(s * 1e6))}\n" for path, s in sorted(self_time.items()))
+
+    def save(self, path: str):
+        """Write the profile: folded stacks for *.folded, else JSON."""
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith('.folded'):
+                f.write(self.folded())
+            else:
+                json.dump(self.to_dict(), f, indent=2)
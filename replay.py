@@ -0,0 +1,131 @@
+"""
+Compact replay files for game.py.
+
+A replay stores only what is needed to play a game again exactly: the seed,
+the mode flags and every answer the players typed (player count, names,
+character choices, crafting decisions). Re-simulating a replay runs the game
+headless with a NullSink, far faster than real time.
+
+Record a game:
+  python game.py --seed 42 --record replays/bug.json
+  python game.py --auto --record replays/demo.json
+
+Re-run replays (files or directories) as a regression corpus:
+  python replay.py replays/
+  python replay.py replays/ --update     # accept the new results
+"""
+import os
+import sys
+import json
+import time
+
+import game
+from events import NullSink
+
+REPLAY_VERSION = 1
+
+
+class RecordingIO(game.ConsoleIO):
+    """ConsoleIO that remembers every answer for the replay file."""
+
+    def __init__(self):
+        self.answers = []
+
+    def ask(self, prompt: str) -> str:
+        answer = input(prompt)
+        self.answers.append(answer)
+        return answer
+
+
+class ReplayIO:
+    """Answers prompts from a recorded list; prints nothing."""
+
+    def __init__(self, answers):
+        self._answers = iter(answers)
+
+    def say(self, text: str = ""):
+        pass
+
+    def ask(self, prompt: str) -> str:
+        try:
+            return next(self._answers)
+        except StopIteration:
+            raise EOFError(f"Replay hat keine Antwort mehr fuer: {prompt.strip()}") from None
+
+
+def make_replay(result, auto: bool, horde: bool, answers) -> dict:
+    return {
+        'v': REPLAY_VERSION,
+        'seed': result['seed'],
+        'auto': auto,
+        'horde': horde,
+        'inputs': list(answers),
+        'result': {'waves': result['waves'], 'rounds': result['rounds']},
+    }
+
+
+def save_replay(path: str, data: dict):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def load_replay(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('v') != REPLAY_VERSION:
+        raise ValueError(f"{path}: unbekannte Replay-Version {data.get('v')}")
+    return data
+
+
+def run_replay(data: dict, sink=None) -> dict:
+    """Play the recorded game again and return its result (waves, rounds)."""
+    result = game.main(auto=data['auto'], horde=data['horde'], sink=sink or NullSink(),
+                       seed=data['seed'], io=ReplayIO(data['inputs']))
+    return {'waves': result['waves'], 'rounds': result['rounds']}
+
+
+def find_replays(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith('.json'):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    update = '--update' in argv
+    paths = [a for a in argv if not a.startswith('--')] or ['replays']
+    failed = 0
+    total = 0
+    start = time.perf_counter()
+    for path in find_replays(paths):
+        total += 1
+        data = load_replay(path)
+        try:
+            result = run_replay(data)
+        except EOFError as e:
+            print(f"FEHLER      {path}: {e}")
+            failed += 1
+            continue
+        if result == data['result']:
+            print(f"OK          {path}: {result['waves']} Wellen")
+        elif update:
+            data['result'] = result
+            save_replay(path, data)
+            print(f"AKTUALISIERT {path}: {result['waves']} Wellen")
+        else:
+            failed += 1
+            print(f"ABWEICHUNG  {path}: erwartet {data['result']['waves']} Wellen, jetzt {result['waves']}")
+    elapsed = time.perf_counter() - start
+    print(f"{total} Replays in {elapsed:.2f}s, {failed} fehlgeschlagen")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
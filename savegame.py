@@ -0,0 +1,372 @@
+"""
+Compact binary save files (checkpoints) for game.py and gui.py.
+
+Layout: an 8 byte header (magic b'KLSV', format version, kind, flags), then
+the payload - little-endian struct records, zlib-compressed when FLAG_ZLIB is
+set. Strings are length-prefixed UTF-8, number columns are raw int32 arrays
+and the gui's tile map is stored as the raw bytes of its chunks, so saving
+and loading is mostly a few large copies. A save is written to PATH.tmp and
+then renamed, so a crash while saving never destroys the last checkpoint.
+
+Autosaver takes a snapshot on the calling thread (where the game state is
+consistent) and compresses and writes it on a background thread.
+
+  python game.py --auto --checkpoint lauf.sav              # checkpoint after waves
+  python game.py --auto --checkpoint lauf.sav --resume     # continue the run
+  python gui.py --size 2000 --checkpoint welt.sav --resume
+  python savegame.py lauf.sav                              # show a save file
+"""
+import os
+import sys
+import zlib
+import struct
+import threading
+from array import array
+from itertools import chain
+
+from game import Character, Monster, stat_columns
+from profiler import clock
+
+MAGIC = b'KLSV'
+FORMAT_VERSION = 2       # 2: the game seed is stored as text
+KIND_GAME = 1    # game.py: party, next wave, random state
+KIND_WORLD = 2   # gui.py: tile map, monsters, player, random state
+KIND_NAMES = {KIND_GAME: 'Textspiel', KIND_WORLD: 'GUI-Welt'}
+FLAG_ZLIB = 1
+ZLIB_LEVEL = 1           # fast; the tile map compresses well even at level 1
+AUTOSAVE_SECONDS = 5.0   # default time between two checkpoints
+
+_HEADER = struct.Struct('<4sHBB')
+_U32 = struct.Struct('<I')
+_GAME = struct.Struct('<BBI')         # auto, horde, next wave (after the seed as text)
+_WORLD = struct.Struct('<IIIIH')      # cols, rows, player x, player y, chunk size
+_STATS = struct.Struct('<6iB')        # hp, max_hp, atk, df, spd, placed_blocks, ability_ready
+_RNG = struct.Struct('<B625IBd')      # version, Mersenne Twister state, has gauss, gauss
+_SWAP = sys.byteorder == 'big'        # int32 columns are stored little-endian
+MONSTER_STATS = ('hp', 'max_hp', 'atk', 'df', 'spd')  # one column each, then x and y
+
+
+class _Writer:
+    def __init__(self):
+        self.parts = []
+
+    def pack(self, fmt: struct.Struct, *values):
+        self.parts.append(fmt.pack(*values))
+
+    def raw(self, data):
+        self.parts.append(data)
+
+    def text(self, s: str):
+        data = s.encode('utf-8')
+        self.parts.append(_U32.pack(len(data)))
+        self.parts.append(data)
+
+    def ints(self, values):
+        column = values if isinstance(values, array) else array('i', values)
+        if _SWAP:
+            column.byteswap()
+        self.parts.append(_U32.pack(len(column)))
+        self.parts.append(column.tobytes())
+
+    def getvalue(self) -> bytes:
+        return b''.join(self.parts)
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def unpack(self, fmt: struct.Struct):
+        values = fmt.unpack_from(self.data, self.pos)
+        self.pos += fmt.size
+        return values
+
+    def raw(self, n: int):
+        if self.pos + n > len(self.data):
+            raise ValueError("Spielstand ist unvollstaendig")
+        data = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return data
+
+    def text(self) -> str:
+        return str(self.raw(self.unpack(_U32)[0]), 'utf-8')
+
+    def ints(self):
+        column = array('i')
+        column.frombytes(self.raw(4 * self.unpack(_U32)[0]))
+        if _SWAP:
+            column.byteswap()
+        return column
+
+
+def _write_rng(w: _Writer, state):
+    version, internal, gauss = state
+    w.pack(_RNG, version, *internal, gauss is not None, gauss or 0.0)
+
+
+def _read_rng(r: _Reader):
+    values = r.unpack(_RNG)
+    return values[0], values[1:626], values[627] if values[626] else None
+
+
+def _write_character(w: _Writer, p):
+    for s in (p.player_name, p.role, p.desc, p.symbol, p.ability, p.ability_desc):
+        w.text(s)
+    w.pack(_STATS, p.hp, p.max_hp, p.atk, p.df, p.spd, p.placed_blocks, p.ability_ready)
+    inventory = dict(p.inventory)
+    w.text('\n'.join(inventory))
+    w.ints(inventory.values())
+
+
+def _read_character(r: _Reader, store=None) -> Character:
+    name, role, desc, symbol, ability, ability_desc = [r.text() for _ in range(6)]
+    hp, max_hp, atk, df, spd, placed_blocks, ability_ready = r.unpack(_STATS)
+    p = Character(name, role, max_hp, atk, df, spd, desc, symbol, ability, ability_desc, store=store)
+    p.hp = hp
+    p.placed_blocks = placed_blocks
+    p.ability_ready = bool(ability_ready)
+    materials = r.text()
+    p.inventory = dict(zip(materials.split('\n') if materials else [], r.ints()))
+    return p
+
+
+def encode_game(players, wave: int, rng, result, auto: bool, horde: bool) -> bytes:
+    """Payload of a game.py checkpoint: the party before `wave`, the random
+    state and the summary so far (seed, rounds per wave)."""
+    w = _Writer()
+    w.text(str(result['seed']))  # any Python int, --seed is not limited to 64 bits
+    w.pack(_GAME, auto, horde, wave)
+    w.ints(result['rounds'])
+    _write_rng(w, rng.getstate())
+    w.pack(_U32, len(players))
+    for p in players:
+        _write_character(w, p)
+    return w.getvalue()
+
+
+def decode_game(payload, store=None) -> dict:
+    """{'seed', 'auto', 'horde', 'wave', 'rounds', 'rng_state', 'players'}.
+    The players are created in `store` (default: game.STORE)."""
+    r = _Reader(payload)
+    try:
+        seed = int(r.text())
+    except ValueError:
+        raise ValueError("Spielstand ist beschaedigt (Seed)") from None
+    auto, horde, wave = r.unpack(_GAME)
+    rounds = r.ints().tolist()
+    rng_state = _read_rng(r)
+    players = [_read_character(r, store) for _ in range(r.unpack(_U32)[0])]
+    return {'seed': seed, 'auto': bool(auto), 'horde': bool(horde), 'wave': wave, 'rounds': rounds,
+            'rng_state': rng_state, 'players': players}
+
+
+def encode_world(grid, chunk_size: int, player, px: int, py: int, monsters, rng) -> bytes:
+    """Payload of a gui.py checkpoint. `grid` is a gui.TileMap (its chunks are
+    stored as raw bytes), `monsters` a gui.MonsterMap (only living monsters
+    are stored)."""
+    w = _Writer()
+    w.pack(_WORLD, grid.cols, grid.rows, px, py, chunk_size)
+    _write_character(w, player)
+    _write_rng(w, rng.getstate())
+    w.ints(chain.from_iterable(grid.chunks))   # chunk keys, then all chunks in the same order
+    w.raw(b''.join(grid.chunks.values()))
+    alive = [entry for entry in monsters if entry[0].is_alive()]
+    w.text('\n'.join(entry[0].name for entry in alive))
+    for column in stat_columns([entry[0] for entry in alive], MONSTER_STATS):
+        w.ints(column)
+    w.ints([entry[1] for entry in alive])
+    w.ints([entry[2] for entry in alive])
+    return w.getvalue()
+
+
+def decode_world(payload, store=None) -> dict:
+    """{'cols', 'rows', 'px', 'py', 'chunk_size', 'player', 'rng_state',
+    'chunks': {(cx, cy): bytearray}, 'monsters': [(Monster, x, y)]}"""
+    r = _Reader(payload)
+    cols, rows, px, py, chunk_size = r.unpack(_WORLD)
+    player = _read_character(r, store)
+    rng_state = _read_rng(r)
+    keys = r.ints()
+    area = chunk_size * chunk_size
+    chunks = {(keys[i], keys[i + 1]): bytearray(r.raw(area)) for i in range(0, len(keys), 2)}
+    names = r.text()
+    hp, max_hp, atk, df, spd, xs, ys = [r.ints() for _ in range(len(MONSTER_STATS) + 2)]
+    monsters = []
+    for i, name in enumerate(names.split('\n') if names else []):
+        m = Monster(name, max_hp[i], atk[i], df[i], spd[i], store=store)
+        m.hp = hp[i]
+        monsters.append((m, xs[i], ys[i]))
+    return {'cols': cols, 'rows': rows, 'px': px, 'py': py, 'chunk_size': chunk_size, 'player': player,
+            'rng_state': rng_state, 'chunks': chunks, 'monsters': monsters}
+
+
+def write_file(path: str, kind: int, payload: bytes, compress: bool = True):
+    """Write header + payload to `path` (via PATH.tmp, then rename)."""
+    flags = FLAG_ZLIB if compress else 0
+    if compress:
+        payload = zlib.compress(payload, ZLIB_LEVEL)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, kind, flags))
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_file(path: str):
+    """(kind, payload) of a save file; ValueError if it is not one or broken."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{path} ist keine Spielstanddatei")
+    magic, version, kind, flags = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} ist keine Spielstanddatei")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path}: Spielstand-Version {version} wird nicht unterstuetzt (erwartet {FORMAT_VERSION})")
+    payload = memoryview(data)[_HEADER.size:]
+    if flags & FLAG_ZLIB:
+        try:
+            payload = zlib.decompress(payload)
+        except zlib.error as e:
+            raise ValueError(f"{path}: Spielstand ist beschaedigt ({e})") from None
+    return kind, payload
+
+
+def load(path: str, kind: int, store=None) -> dict:
+    """Read and decode a save file of the given kind (KIND_GAME or KIND_WORLD).
+    Characters and monsters are created in `store` (default: game.STORE)."""
+    found, payload = read_file(path)
+    if found != kind:
+        raise ValueError(f"{path} ist ein Spielstand fuer {KIND_NAMES.get(found, found)}, "
+                         f"nicht fuer {KIND_NAMES[kind]}")
+    try:
+        return decode_game(payload, store) if kind == KIND_GAME else decode_world(payload, store)
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f"{path}: Spielstand ist beschaedigt ({e})") from None
+
+
+class Autosaver:
+    """Writes checkpoints to `path` on a background thread.
+
+    save() takes an already encoded payload and returns at once; compressing
+    and writing happen on the thread. If a new payload arrives before the
+    previous one was written, only the newest is written. due() says whether
+    `interval` seconds passed since the last save() (0 = always)."""
+
+    def __init__(self, path: str, interval: float = AUTOSAVE_SECONDS, compress: bool = True):
+        self.path = path
+        self.interval = interval
+        self.compress = compress
+        self.saves = 0      # files written
+        self.skipped = 0    # payloads replaced by a newer one before writing
+        self.write_ms = 0.0  # compress + write time of the last file
+        self.error = None
+        self._last = clock()
+        self._pending = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='autosave', daemon=True)
+        self._thread.start()
+
+    def due(self) -> bool:
+        return clock() - self._last >= self.interval
+
+    def save(self, kind: int, payload: bytes):
+        with self._cond:
+            if self._pending is not None:
+                self.skipped += 1
+            self._pending = (kind, payload)
+            self._last = clock()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                kind, payload = self._pending
+                self._pending = None
+            start = clock()
+            try:
+                write_file(self.path, kind, payload, self.compress)
+            except OSError as e:
+                self.error = e
+            else:
+                self.saves += 1
+                self.write_ms = (clock() - start) * 1000
+            with self._cond:
+                self._cond.notify_all()
+
+    def wait(self):
+        """Block until the last payload passed to save() is written."""
+        with self._cond:
+            while self._pending is not None and self._thread.is_alive():
+                self._cond.wait()
+
+    def close(self):
+        """Write what is pending and stop the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        if self.error:
+            print(f"Speichern nach {self.path} fehlgeschlagen: {self.error}", file=sys.stderr)
+
+    def __str__(self):
+        return f"{self.saves} Spielstaende nach {self.path} (zuletzt {self.write_ms:.1f} ms Schreiben)"
+
+
+class GameCheckpoints(Autosaver):
+    """The `checkpoint` callback of game.play(): called after every wave,
+    saves when due()."""
+
+    def __init__(self, path: str, auto: bool, horde: bool, interval: float = AUTOSAVE_SECONDS):
+        super().__init__(path, interval)
+        self.auto = auto
+        self.horde = horde
+
+    def __call__(self, players, wave: int, rng, result):
+        if self.due():
+            self.save(KIND_GAME, encode_game(players, wave, rng, result, self.auto, self.horde))
+
+
+def describe(path: str) -> str:
+    """Short German description of a save file."""
+    kind, payload = read_file(path)
+    start = clock()
+    state = load(path, kind)
+    ms = (clock() - start) * 1000
+    size = os.path.getsize(path)
+    head = (f"{path}: {KIND_NAMES.get(kind, kind)}, Version {FORMAT_VERSION}, {size:,} Bytes "
+            f"({len(payload):,} entpackt), geladen in {ms:.1f} ms")
+    if kind == KIND_GAME:
+        mode = ('Auto' if state['auto'] else 'Interaktiv') + (', Horde' if state['horde'] else '')
+        party = ", ".join(f"{p.player_name} ({p.role}, HP {p.hp}/{p.max_hp})" for p in state['players'])
+        return f"{head}\nSeed {state['seed']}, {mode}, naechste Welle {state['wave']}\nParty: {party}"
+    blocks = sum(chunk.count(1) for chunk in state['chunks'].values())  # gui.BLOCK tiles
+    return (f"{head}\nWelt {state['cols']}x{state['rows']}, Spieler bei ({state['px']}, {state['py']}), "
+            f"{blocks} Bloecke, {len(state['monsters'])} Monster")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("Aufruf: python savegame.py SPIELSTAND [SPIELSTAND ...]")
+        sys.exit(2)
+    failed = 0
+    for path in argv:
+        try:
+            print(describe(path))
+        except (OSError, ValueError) as e:
+            print(f"FEHLER {e}")
+            failed += 1
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+asyncio server that hosts many interactive text games at once.
+
+Every connection is one game of game.py (interactive mode), and all sessions
+share one event loop: the game runs as steps (game.play), so a session only
+needs the loop while it computes, not while it waits for an answer. Waves
+with at least --offload monsters (horde mode) run in a worker process
+instead, so one huge fight does not stall the other sessions; the session's
+random state travels with the wave, so results stay the same as in one
+process.
+
+Protocol: UTF-8 text. The server sends the game output followed by a
+prompt, which ends with a NUL byte (PROMPT_END); the client answers with one
+line. When the game is over the server sends the rest of the output and
+closes the connection.
+
+  python server.py                           # 127.0.0.1:8765
+  python server.py --port 9000 --horde --offload 200 --workers 4 --seed 1
+  python server.py --unix /tmp/klara.sock
+  nc 127.0.0.1 8765                          # play by hand
+  python loadgen.py --sessions 1000 --concurrency 200
+"""
+import os
+import sys
+import random
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from game import Character, ConsoleSink, WaveJob, play, run_wave, arg_value
+from events import ROUND
+
+HOST = '127.0.0.1'
+PORT = 8765
+PROMPT_END = b'\0'
+OFFLOAD_MONSTERS = 200   # waves with at least this many monsters go to a worker process
+ANSWER_TIMEOUT = 300     # seconds a session may wait for an answer
+MAX_ANSWER = 1024        # longer answer lines are cut
+
+
+class SessionOutput:
+    """Game text of one session until the next prompt. Serves as stream of
+    the session's ConsoleSink and as `io` for game.play (say only - prompts
+    come out of play() as steps)."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, text: str):
+        self._parts.append(text)
+
+    def flush(self):
+        pass
+
+    def say(self, text: str = ""):
+        self._parts.append(text + "\n")
+
+    def take(self) -> str:
+        text = ''.join(self._parts)
+        self._parts = []
+        return text
+
+
+def run_wave_remote(players, wave: int, auto: bool, rng_state, level: int, horde: bool):
+    """Worker process: run_wave on copies of the players (name, role, hp,
+    max_hp, atk, df, spd, inventory), continuing the session's random
+    stream. Returns (won, rounds, new random state, (hp, inventory) per
+    player, console text)."""
+    rng = random.Random()
+    rng.setstate(rng_state)
+    party = []
+    for name, role, hp, max_hp, atk, df, spd, inventory in players:
+        p = Character(name, role, max_hp, atk, df, spd, '')
+        p.hp = hp
+        p.inventory = inventory
+        party.append(p)
+    out = SessionOutput()
+    sink = ConsoleSink(level, stream=out)
+    stats = {}
+    won = run_wave(party, wave, auto=auto, rng=rng, sink=sink, stats=stats, horde=horde)
+    sink.flush()
+    return won, stats['rounds'], rng.getstate(), [(p.hp, dict(p.inventory)) for p in party], out.take()
+
+
+class GameServer:
+    """Runs one game.play() per connection. `seed` (if given) makes session
+    n use seed + n; `pool` is the ProcessPoolExecutor for large waves."""
+
+    def __init__(self, level: int = ROUND, horde: bool = False, seed=None, pool=None,
+                 offload: int = OFFLOAD_MONSTERS, timeout: float = ANSWER_TIMEOUT):
+        self.level = level
+        self.horde = horde
+        self.seed = seed
+        self.pool = pool
+        self.offload = offload
+        self.timeout = timeout
+        self.sessions = 0
+        self.active = 0
+        self.finished = 0
+        self.offloaded = 0
+
+    async def run_wave(self, job: WaveJob, out: SessionOutput) -> bool:
+        if self.pool is None or job.monsters() < self.offload:
+            return job.run()
+        self.offloaded += 1
+        job.sink.flush()
+        players = [(p.player_name, p.role, p.hp, p.max_hp, p.atk, p.df, p.spd, dict(p.inventory))
+                   for p in job.players]
+        won, rounds, state, party, text = await asyncio.get_running_loop().run_in_executor(
+            self.pool, run_wave_remote, players, job.wave, job.auto, job.rng.getstate(), job.sink.level, job.horde)
+        job.rng.setstate(state)
+        for p, (hp, inventory) in zip(job.players, party):
+            p.hp = hp
+            p.inventory = inventory
+        job.stats['rounds'] = rounds
+        out.write(text)
+        return won
+
+    async def handle(self, reader, writer):
+        number = self.sessions
+        self.sessions += 1
+        self.active += 1
+        out = SessionOutput()
+        sink = ConsoleSink(self.level, stream=out)
+        seed = None if self.seed is None else self.seed + number
+        steps = play(horde=self.horde, sink=sink, seed=seed, io=out)
+        try:
+            step = next(steps)
+            while True:
+                if isinstance(step, WaveJob):
+                    answer = await self.run_wave(step, out)
+                else:
+                    sink.flush()
+                    writer.write((out.take() + step).encode() + PROMPT_END)
+                    await writer.drain()
+                    line = await asyncio.wait_for(reader.readline(), self.timeout)
+                    if not line:
+                        return  # client left
+                    answer = line[:MAX_ANSWER].decode('utf-8', 'replace').rstrip('\r\n')
+                step = steps.send(answer)
+        except StopIteration:
+            # game over
+            sink.flush()
+            writer.write(out.take().encode())
+            await writer.drain()
+            self.finished += 1
+        except (ConnectionError, asyncio.TimeoutError, ValueError):
+            pass  # client gone, too slow or line too long
+        finally:
+            steps.close()
+            self.active -= 1
+            writer.close()
+
+    def __str__(self):
+        return (f"{self.sessions} Sitzungen ({self.finished} zu Ende gespielt, {self.active} aktiv), "
+                f"{self.offloaded} Wellen im Worker-Prozess")
+
+
+async def serve(server: GameServer, host=HOST, port=PORT, unix=None):
+    if unix:
+        listener = await asyncio.start_unix_server(server.handle, path=unix)
+        where = unix
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+        where = f"{host}:{port}"
+    print(f"Spielserver laeuft auf {where} (Strg+C beendet)", flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    seed = arg_value(argv, '--seed')
+    workers = int(arg_value(argv, '--workers', os.cpu_count() or 1))
+    # spawn, not fork: forked workers would inherit (and keep open) the sockets of running sessions
+    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) if workers > 0 else None
+    server = GameServer(level=int(arg_value(argv, '--verbosity', ROUND)), horde='--horde' in argv,
+                        seed=int(seed) if seed is not None else None, pool=pool,
+                        offload=int(arg_value(argv, '--offload', OFFLOAD_MONSTERS)),
+                        timeout=float(arg_value(argv, '--timeout', ANSWER_TIMEOUT)))
+    try:
+        asyncio.run(serve(server, arg_value(argv, '--host', HOST), int(arg_value(argv, '--port', PORT)),
+                          arg_value(argv, '--unix')))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+        print(f"\nServer beendet: {server}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+"""
+Headless fixed-timestep simulation of the 3D prototype.
+
+World holds the whole game state of gui3d.py in plain Python: player
+position and view direction, enemies, projectiles, wood and the voxel
+blocks. It advances in fixed ticks of TICK seconds, so the result only
+depends on the seed and on what the player does on which tick - not on the
+frame rate. gui3d.py feeds the frame time into World.advance(), reads the
+state and interpolates between the last two ticks; spawns, kills and
+block changes are reported as events (World.pop_events()).
+
+Run a match without a window, with a simple bot as the player:
+  python sim3d.py --ticks 36000 --seed 1
+  python sim3d.py --check     # same result with random frame times?
+  python sim3d.py --enemy-budget 1.5   # enemy update LOD, 1.5 ms per tick
+
+Without --enemy-budget every enemy moves every tick and a seed always gives
+the same match. With it, far enemies are updated less often so that enemy
+movement stays within the budget; the result then depends on the machine.
+"""
+import sys
+import math
+import time
+import random
+import hashlib
+
+from game import arg_value
+from profiler import NULL_PROFILER
+
+TICK = 1 / 60
+MAX_STEPS_PER_FRAME = 5  # under heavy load the game slows down instead of spiralling
+
+GRID_SIZE = 10
+ENEMY_Y = 0.5
+ENEMY_SPEED = 1.2
+ENEMY_STOP = 0.2          # enemies stop this close to the player
+PROJECTILE_SPEED = 18
+PROJECTILE_LIFETIME = 1.0
+PROJECTILE_OFFSET = 1.5   # projectiles start this far in front of the player
+HIT_RADIUS = 0.9
+# broadphase cell size on the XZ plane; >= HIT_RADIUS, so every enemy a
+# projectile can hit lies in the 3x3 cells around it
+GRID_CELL = 1.0
+BLOCK_COST = 1
+BLOCK_REACH = 2           # blocks go into the column this far in front of the player
+MAX_STACK = 16
+ENEMY_CAP = 2000
+PROJECTILE_CAP = 512
+# enemy update LOD (only with an enemy budget, see World.move_enemies): enemies
+# within LOD_NEAR of the player move every tick, the others in round-robin
+# slices whose size adapts to the budget
+LOD_NEAR = 6.0
+LOD_MIN_SLICE = 8         # far enemies updated per tick even when over budget
+LOD_SLICE_STEP = 16       # slice growth per tick while under budget
+
+
+class Enemy:
+    __slots__ = ('id', 'x', 'y', 'z', 'prev_x', 'prev_z', 'health', 'moved', 'near')
+
+    def __init__(self, eid: int, x: float, z: float):
+        self.id = eid
+        self.x, self.y, self.z = x, ENEMY_Y, z
+        self.prev_x, self.prev_z = x, z
+        self.health = 1
+        # LOD bookkeeping: tick of the last move, and whether it was close to the player then
+        self.moved = 0
+        self.near = True
+
+
+class Projectile:
+    __slots__ = ('id', 'x', 'y', 'z', 'prev_x', 'prev_y', 'prev_z', 'dx', 'dy', 'dz', 'lifetime')
+
+    def __init__(self, pid: int, position, direction):
+        self.id = pid
+        self.x, self.y, self.z = position
+        self.prev_x, self.prev_y, self.prev_z = position
+        self.dx, self.dy, self.dz = direction
+        self.lifetime = PROJECTILE_LIFETIME
+
+
+class World:
+    """The 3D game state. Call the actions (fire, place_block, ...) between
+    ticks and step()/advance() to move time forward.
+
+    Events (tuples) for the view: ('enemy_spawned', enemy),
+    ('enemy_killed', enemy), ('projectile_fired', projectile),
+    ('projectile_removed', projectile), ('block_placed', cell),
+    ('block_removed', cell), ('inventory',)."""
+
+    def __init__(self, seed=None, enemy_budget_ms=None):
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.rng = random.Random(self.seed)
+        self.tick = 0
+        self.player = (0.0, 0.0, 0.0)
+        self.forward = (0.0, 0.0, 1.0)
+        self.inventory = {'holz': 0}
+        self.enemies = []      # in spawn order, which decides who is hit first
+        self.projectiles = []
+        self.blocks = set()    # voxel cells (x, level, z); level 0 sits on the ground
+        self.spawn_timer = 0.0
+        self.kills = 0
+        self.refused = {'enemy': 0, 'projectile': 0}
+        self.events = []
+        self._next_id = 0
+        self._acc = 0.0
+        # None: every enemy moves every tick (exact, reproducible). A number:
+        # milliseconds per tick for enemy movement; depends on the machine
+        self.enemy_budget_ms = enemy_budget_ms
+        self.far_slice = LOD_MIN_SLICE
+        self._far_cursor = 0
+        self.lod = {'far': 0, 'updated': 0, 'ms': 0.0}
+        # timings of the tick phases (projectiles, enemies, spawning); the
+        # view sets this to its frametimes.FrameStats
+        self.prof = NULL_PROFILER
+
+    def _id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    def pop_events(self):
+        events, self.events = self.events, []
+        return events
+
+    # --- player actions -------------------------------------------------------
+
+    def set_player(self, position, forward):
+        self.player = tuple(position)
+        self.forward = tuple(forward)
+
+    def fire(self):
+        if len(self.projectiles) >= PROJECTILE_CAP:
+            self.refused['projectile'] += 1
+            return None
+        (x, y, z), (fx, fy, fz) = self.player, self.forward
+        p = Projectile(self._id(), (x + fx * PROJECTILE_OFFSET, y + fy * PROJECTILE_OFFSET, z + fz * PROJECTILE_OFFSET),
+                       (fx, fy, fz))
+        self.projectiles.append(p)
+        self.events.append(('projectile_fired', p))
+        return p
+
+    def target_column(self):
+        # grid column (x, z) in front of the player
+        (x, _, z), (fx, _, fz) = self.player, self.forward
+        return round(x + fx * BLOCK_REACH), round(z + fz * BLOCK_REACH)
+
+    def column_height(self, x: int, z: int) -> int:
+        level = 0
+        while (x, level, z) in self.blocks:
+            level += 1
+        return level
+
+    def is_solid(self, cell) -> bool:
+        return cell in self.blocks
+
+    def place_block(self):
+        """Stack a block on the target column; returns its cell or None."""
+        if self.inventory.get('holz', 0) < BLOCK_COST:
+            return None
+        x, z = self.target_column()
+        level = self.column_height(x, z)
+        if level >= MAX_STACK:
+            return None
+        self.inventory['holz'] -= BLOCK_COST
+        self.blocks.add((x, level, z))
+        self.events.append(('block_placed', (x, level, z)))
+        self.events.append(('inventory',))
+        return (x, level, z)
+
+    def remove_block(self):
+        """Take the top block of the target column back into the inventory."""
+        x, z = self.target_column()
+        level = self.column_height(x, z)
+        if level == 0:
+            return None
+        self.blocks.discard((x, level - 1, z))
+        self.inventory['holz'] = self.inventory.get('holz', 0) + BLOCK_COST
+        self.events.append(('block_removed', (x, level - 1, z)))
+        self.events.append(('inventory',))
+        return (x, level - 1, z)
+
+    def spawn_enemy(self):
+        # spawn at a random edge
+        r, g = self.rng, GRID_SIZE
+        choices = [(-g, 0, r.randint(-g, g)), (g, 0, r.randint(-g, g)), (r.randint(-g, g), 0, -g), (r.randint(-g, g), 0, g)]
+        x, _, z = r.choice(choices)
+        if len(self.enemies) >= ENEMY_CAP:
+            self.refused['enemy'] += 1
+            return None
+        e = Enemy(self._id(), x, z)
+        e.moved = self.tick
+        self.enemies.append(e)
+        self.events.append(('enemy_spawned', e))
+        return e
+
+    # --- simulation ---------------------------------------------------------------
+
+    def enemy_grid(self):
+        # (cell x, cell z) -> [(index in self.enemies, enemy)]
+        grid = {}
+        for i, e in enumerate(self.enemies):
+            grid.setdefault((math.floor(e.x / GRID_CELL), math.floor(e.z / GRID_CELL)), []).append((i, e))
+        return grid
+
+    def move_projectiles(self, dt: float):
+        grid = self.enemy_grid()
+        killed = set()
+        survivors = []
+        for p in self.projectiles:
+            p.prev_x, p.prev_y, p.prev_z = p.x, p.y, p.z
+            step = PROJECTILE_SPEED * dt
+            p.x += p.dx * step
+            p.y += p.dy * step
+            p.z += p.dz * step
+            p.lifetime -= dt
+            # the first enemy in spawn order within HIT_RADIUS is hit
+            cx, cz = math.floor(p.x / GRID_CELL), math.floor(p.z / GRID_CELL)
+            hit = None
+            for gx in (cx - 1, cx, cx + 1):
+                for gz in (cz - 1, cz, cz + 1):
+                    for i, e in grid.get((gx, gz), ()):
+                        if (hit is None or i < hit) and i not in killed and \
+                                math.dist((p.x, p.y, p.z), (e.x, e.y, e.z)) < HIT_RADIUS:
+                            hit = i
+            if hit is not None:
+                # enemy dies, drops wood
+                killed.add(hit)
+                self.kills += 1
+                self.inventory['holz'] = self.inventory.get('holz', 0) + 1
+                self.events.append(('enemy_killed', self.enemies[hit]))
+                self.events.append(('projectile_removed', p))
+                self.events.append(('inventory',))
+            elif p.lifetime <= 0:
+                self.events.append(('projectile_removed', p))
+            else:
+                survivors.append(p)
+        self.projectiles = survivors
+        if killed:
+            self.enemies = [e for i, e in enumerate(self.enemies) if i not in killed]
+
+    def move_enemies(self, dt: float):
+        if self.enemy_budget_ms is not None:
+            return self._move_enemies_lod(dt)
+        px, _, pz = self.player
+        for e in self.enemies:
+            e.prev_x, e.prev_z = e.x, e.z
+            # move toward the player on the XZ plane
+            dx, dz = px - e.x, pz - e.z
+            length = math.hypot(dx, dz)
+            if length > ENEMY_STOP:
+                e.x += dx / length * dt * ENEMY_SPEED
+                e.z += dz / length * dt * ENEMY_SPEED
+
+    def _move_enemies_lod(self, dt: float):
+        # near enemies move every tick. Far ones are only touched when the
+        # round-robin slice reaches them and then catch up on all ticks since
+        # their last move. The slice shrinks by half when the tick went over
+        # budget and grows slowly while under it.
+        start = time.perf_counter()
+        px, _, pz = self.player
+        tick = self.tick
+        far = []
+        for e in self.enemies:
+            if e.near:
+                self._move_enemy(e, px, pz, tick, dt)
+            else:
+                far.append(e)
+        n = min(self.far_slice, len(far))
+        if n:
+            first = self._far_cursor % len(far)
+            for i in range(first, first + n):
+                self._move_enemy(far[i % len(far)], px, pz, tick, dt)
+            self._far_cursor = first + n
+        ms = (time.perf_counter() - start) * 1000
+        if ms > self.enemy_budget_ms:
+            self.far_slice = max(LOD_MIN_SLICE, self.far_slice // 2)
+        elif self.far_slice < len(far):
+            self.far_slice += LOD_SLICE_STEP
+        self.lod = {'far': len(far), 'updated': len(self.enemies) - len(far) + n, 'ms': ms}
+
+    @staticmethod
+    def _move_enemy(e, px: float, pz: float, tick: int, dt: float):
+        x, z = e.x, e.z
+        dx, dz = px - x, pz - z
+        length = math.hypot(dx, dz)
+        if length > ENEMY_STOP:
+            # never overshoot the stop distance after a long lag
+            step = min((tick + 1 - e.moved) * dt * ENEMY_SPEED, length - ENEMY_STOP)
+            e.x += dx / length * step
+            e.z += dz / length * step
+        e.moved = tick + 1
+        e.near = length <= LOD_NEAR
+        # far enemies jump to their new position instead of being interpolated
+        e.prev_x, e.prev_z = (x, z) if e.near else (e.x, e.z)
+
+    def step(self):
+        """Advance the world by one tick."""
+        prof = self.prof
+        with prof.phase('projectiles'):
+            self.move_projectiles(TICK)
+        with prof.phase('enemies'):
+            self.move_enemies(TICK)
+        with prof.phase('spawning'):
+            self.spawn_timer -= TICK
+            if self.spawn_timer <= 0:
+                self.spawn_enemy()
+                self.spawn_timer = max(1.8, 3.0 + self.rng.uniform(-1, 1))
+        self.tick += 1
+
+    def advance(self, dt: float, control=None) -> float:
+        """Run as many ticks as fit into the elapsed frame time (at most
+        MAX_STEPS_PER_FRAME); `control(world)` is called before every tick.
+        Returns the interpolation factor (0..1) between the last two ticks."""
+        self._acc += dt
+        steps = 0
+        while self._acc >= TICK and steps < MAX_STEPS_PER_FRAME:
+            if control:
+                control(self)
+            self.step()
+            self._acc -= TICK
+            steps += 1
+        if steps == MAX_STEPS_PER_FRAME:
+            self._acc = min(self._acc, TICK)
+        return self._acc / TICK
+
+    def summary(self) -> dict:
+        """Result of the match so far, with a checksum over the full state."""
+        state = (self.tick, sorted(self.inventory.items()), sorted(self.blocks),
+                 [(e.id, e.x, e.z) for e in self.enemies], [(p.id, p.x, p.y, p.z, p.lifetime) for p in self.projectiles])
+        return {
+            'tick': self.tick, 'kills': self.kills, 'holz': self.inventory.get('holz', 0),
+            'enemies': len(self.enemies), 'blocks': len(self.blocks),
+            'checksum': hashlib.sha1(repr(state).encode()).hexdigest()[:12],
+        }
+
+
+def bot(fire_every: int = 20, build_every: int = 600):
+    """A simple player for headless matches: stands at the origin, turns to
+    the closest enemy, fires every `fire_every` ticks and builds a block
+    every `build_every` ticks."""
+    def control(world):
+        if world.enemies:
+            px, _, pz = world.player
+            e = min(world.enemies, key=lambda e: (e.x - px) ** 2 + (e.z - pz) ** 2)
+            length = math.hypot(e.x - px, e.z - pz) or 1.0
+            world.forward = ((e.x - px) / length, 0.0, (e.z - pz) / length)
+        if world.tick % fire_every == 0:
+            world.fire()
+        if world.tick % build_every == 0:
+            world.place_block()
+        world.pop_events()  # nobody draws them
+    return control
+
+
+def play(ticks: int, seed: int = 0, control=None, enemy_budget_ms=None):
+    """Run a headless match for `ticks` ticks; returns the World."""
+    world = World(seed, enemy_budget_ms)
+    control = control or bot()
+    for _ in range(2):
+        world.spawn_enemy()
+    for _ in range(ticks):
+        control(world)
+        world.step()
+    return world
+
+
+def check_frame_rate_independence(ticks: int, seed: int = 0, frames_seed: int = 1):
+    """Play the same match once with fixed steps and once driven by random
+    frame times through advance(); both must end in the same state."""
+    fixed = play(ticks, seed).summary()
+    world = World(seed)
+    for _ in range(2):
+        world.spawn_enemy()
+    frames = random.Random(frames_seed)
+    drive = bot()
+    result = {}
+
+    def control(w):
+        if w.tick == ticks:
+            result.update(w.summary())
+        drive(w)
+
+    while world.tick <= ticks:
+        world.advance(frames.uniform(1 / 240, 1 / 20), control)
+    return fixed, result
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    ticks = int(arg_value(argv, '--ticks', 36000))
+    seed = int(arg_value(argv, '--seed', 0))
+    budget = arg_value(argv, '--enemy-budget')
+    if '--check' in argv:
+        fixed, variable = check_frame_rate_independence(ticks, seed)
+        same = fixed == variable
+        print(f"Feste Schritte:    {fixed}")
+        print(f"Zufaellige Frames: {variable}")
+        print("OK: gleiches Ergebnis" if same else "ABWEICHUNG")
+        sys.exit(0 if same else 1)
+
+    start = time.perf_counter()
+    world = play(ticks, seed, enemy_budget_ms=float(budget) if budget else None)
+    elapsed = time.perf_counter() - start
+    s = world.summary()
+    print(f"{ticks} Ticks ({ticks * TICK:.0f}s Spielzeit) in {elapsed:.2f}s ({ticks / elapsed:,.0f} Ticks/s), Seed {seed}")
+    print(f"Besiegt: {s['kills']}, Holz: {s['holz']}, Gegner: {s['enemies']}, Bloecke: {s['blocks']}, Pruefsumme {s['checksum']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Headless batch simulation of the auto/demo mode from game.py.
+
+Runs many complete games (run_wave + auto_craft until the party dies) without
+any console output, spread over a process pool. Every chunk of games gets its
+own seeded random.Random, so results only depend on the seed and the number of
+games - not on the number of worker processes.
+
+Usage:
+  python simulate.py 100000 --workers 8 --seed 1
+  python game.py --simulate 100000 --workers 8 [--horde]
+"""
+import os
+import sys
+import json
+import time
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from game import make_character, init_materials, run_wave, auto_craft, arg_value
+from events import NullSink
+
+DEMO_KEYS = ["1", "2", "3"]
+CHUNK_SIZE = 500  # games per task; small enough for load balancing across workers
+MAX_WAVES = 1000  # safety net, real games end long before this
+SILENT = NullSink()
+
+
+def play_game(rng, keys=DEMO_KEYS, max_waves=MAX_WAVES, horde=False):
+    """Play one silent auto-mode game. Returns waves survived, rounds per wave
+    and the roles of all players that died (in order of death)."""
+    players = [make_character(f"Spieler{i}", k) for i, k in enumerate(keys, 1)]
+    init_materials(players)
+    result = {'waves': 0, 'rounds': [], 'deaths': []}
+    for wave in range(1, max_waves + 1):
+        alive_before = [p for p in players if p.is_alive()]
+        stats = {}
+        ok = run_wave(players, wave, auto=True, rng=rng, sink=SILENT, stats=stats, horde=horde)
+        result['rounds'].append(stats['rounds'])
+        result['deaths'].extend(p.role for p in alive_before if not p.is_alive())
+        if not ok:
+            break
+        result['waves'] += 1
+        auto_craft(players, SILENT, wave + 1)
+    return result
+
+
+def new_totals():
+    return {
+        'games': 0,
+        'waves_hist': {},    # waves survived -> number of games
+        'rounds_sum': [],    # index = wave - 1
+        'rounds_count': [],
+        'deaths': {},        # role -> number of deaths
+    }
+
+
+def add_game(totals, result):
+    totals['games'] += 1
+    w = result['waves']
+    totals['waves_hist'][w] = totals['waves_hist'].get(w, 0) + 1
+    for i, r in enumerate(result['rounds']):
+        if i == len(totals['rounds_sum']):
+            totals['rounds_sum'].append(0)
+            totals['rounds_count'].append(0)
+        totals['rounds_sum'][i] += r
+        totals['rounds_count'][i] += 1
+    for role in result['deaths']:
+        totals['deaths'][role] = totals['deaths'].get(role, 0) + 1
+
+
+def merge_totals(into, other):
+    into['games'] += other['games']
+    for w, n in other['waves_hist'].items():
+        into['waves_hist'][w] = into['waves_hist'].get(w, 0) + n
+    for i, (s, c) in enumerate(zip(other['rounds_sum'], other['rounds_count'])):
+        if i == len(into['rounds_sum']):
+            into['rounds_sum'].append(0)
+            into['rounds_count'].append(0)
+        into['rounds_sum'][i] += s
+        into['rounds_count'][i] += c
+    for role, n in other['deaths'].items():
+        into['deaths'][role] = into['deaths'].get(role, 0) + n
+    return into
+
+
+def chunk_seed(seed: int, index: int) -> int:
+    # independent, reproducible stream per chunk
+    return random.Random(seed * 1_000_003 + index).getrandbits(64)
+
+
+def run_chunk(args):
+    """Worker entry point: play `games` games with a RNG seeded from `seed`."""
+    seed, games, horde = args
+    rng = random.Random(seed)
+    totals = new_totals()
+    for _ in range(games):
+        add_game(totals, play_game(rng, horde=horde))
+    return totals
+
+
+def simulate(games: int, workers: int = 1, seed: int = 0, chunk_size: int = CHUNK_SIZE, horde=False):
+    """Run `games` games on `workers` processes and return the merged totals."""
+    tasks = []
+    for i, start in enumerate(range(0, games, chunk_size)):
+        tasks.append((chunk_seed(seed, i), min(chunk_size, games - start), horde))
+    totals = new_totals()
+    if workers <= 1:
+        for task in tasks:
+            merge_totals(totals, run_chunk(task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(run_chunk, tasks):
+                merge_totals(totals, part)
+    return totals
+
+
+def format_totals(totals) -> str:
+    games = totals['games']
+    lines = []
+    if not games:
+        return "Keine Spiele simuliert."
+    hist = totals['waves_hist']
+    mean_waves = sum(w * n for w, n in hist.items()) / games
+    lines.append(f"Ueberlebte Wellen: Durchschnitt {mean_waves:.2f}, Maximum {max(hist)}")
+    lines.append("Verteilung: " + ", ".join(f"{w}: {hist[w]}" for w in sorted(hist)))
+    rounds = ", ".join(
+        f"W{i + 1}: {s / c:.2f}" for i, (s, c) in enumerate(zip(totals['rounds_sum'], totals['rounds_count'])) if c
+    )
+    lines.append(f"Runden pro Welle (Durchschnitt): {rounds}")
+    deaths = ", ".join(f"{role}: {n}" for role, n in sorted(totals['deaths'].items()))
+    lines.append(f"Tode pro Rolle: {deaths}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    games = arg_value(argv, '--simulate')
+    if games is None:
+        # allow `python simulate.py N ...`
+        games = argv[0] if argv and argv[0].isdigit() else '1000'
+    games = int(games)
+    workers = int(arg_value(argv, '--workers', os.cpu_count() or 1))
+    seed = int(arg_value(argv, '--seed', 0))
+    json_path = arg_value(argv, '--json')
+    horde = '--horde' in argv
+
+    print(f"Simulation: {games} Spiele, {workers} Prozesse, Seed {seed}{' (Horde-Modus)' if horde else ''}")
+    start = time.perf_counter()
+    totals = simulate(games, workers, seed, horde=horde)
+    elapsed = time.perf_counter() - start
+    print(f"Dauer: {elapsed:.2f}s ({games / elapsed:.0f} Spiele/s)")
+    print(format_totals(totals))
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(totals, f, indent=2)
+        print(f"Ergebnisse gespeichert in {json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Exact combat outcomes from the calculate_damage distribution.
+
+calculate_damage() adds a uniform randint(0, max(1, base // 2)) to
+base = max(1, atk - df), so every hit has a small, known damage
+distribution. Instead of sampling fights, this module pushes probabilities
+through them:
+
+- damage_pmf(atk, df): damage of one hit
+- hits_to_kill(atk, df, hp): how many hits a target with `hp` takes, by
+  convolving the damage distribution (memoized on (atk, df, hp)); used for
+  the expected-hits summary, solve_encounter works on the HP states directly
+- solve_encounter(players, monsters): the distribution over all states of a
+  fight with the rules of game.combat_round, giving the exact win
+  probability and the expected number of rounds
+
+generate_wave rolls the monster stats, so a wave is not one fight but many
+possible ones - far too many to enumerate (220 stat combinations per
+goblin). The per-wave survival of solve_wave() is therefore a sample mean:
+random compositions are solved exactly in batches of BATCH until the
+standard error is surely at most --se (default 1%) or --samples
+compositions are done, and the standard error is printed next to it. Only
+wave 1 (always the same two goblins) is exact. One fight takes milliseconds
+for the early waves and 0.1-0.8 s for five goblins or a boss - the number of
+reachable HP combinations decides, not the win probability. A wave that is
+always won or lost still takes about 100 compositions, one that depends on
+the composition many more: with the demo party, wave 4 (89.4% +- 0.8%)
+took 960 compositions and 8 minutes, the default run of waves 1-10 about
+11 minutes on one core. --workers spreads the fights over processes.
+
+  python solver.py                        # demo party, waves 1-10
+  python solver.py --party 1,2,3,4 --waves 1,2,3 --se 0.03 --workers 8
+  python solver.py --check --n 20000      # against the simulator
+"""
+import os
+import sys
+import math
+import time
+import random
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+from game import (CHAR_TEMPLATES, Monster, TurnScheduler, combat_round, generate_wave,
+                  make_character, arg_value)
+
+DEMO_KEYS = ["1", "2", "3"]
+SAMPLES = 2000      # at most this many compositions per wave
+TARGET_SE = 0.01    # stop sampling a wave once the standard error of its win probability is this small
+BATCH = 20          # compositions drawn and solved per step (and the minimum per wave)
+PRUNE = 1e-10       # solve_wave drops fight states less likely than this (a few 1e-7 of the win probability)
+
+
+@lru_cache(maxsize=None)
+def damage_pmf(atk: int, df: int):
+    """((damage, probability), ...) of one calculate_damage(atk, df) hit."""
+    base = max(1, atk - df)
+    spread = max(1, base // 2)
+    return tuple((base + r, 1 / (spread + 1)) for r in range(spread + 1))
+
+
+@lru_cache(maxsize=None)
+def _kill_table(atk: int, df: int):
+    # hits_to_kill for hp = 0, 1, 2, ...; grown bottom-up by hits_to_kill
+    return [(1.0,)]
+
+
+@lru_cache(maxsize=None)
+def hits_to_kill(atk: int, df: int, hp: int):
+    """Probability that exactly k hits are needed to bring `hp` to 0, as a
+    tuple indexed by k. Built bottom-up over hp, so large HP need no deep
+    recursion."""
+    table = _kill_table(atk, df)
+    if hp < len(table):
+        return table[max(hp, 0)]
+    hits = damage_pmf(atk, df)
+    for h in range(len(table), hp + 1):
+        pmf = [0.0]
+        for dmg, p in hits:
+            for k, q in enumerate(table[max(h - dmg, 0)], 1):
+                if k == len(pmf):
+                    pmf.append(0.0)
+                pmf[k] += p * q
+        table.append(tuple(pmf))
+    return table[hp]
+
+
+def expected_hits(atk: int, df: int, hp: int) -> float:
+    return sum(k * p for k, p in enumerate(hits_to_kill(atk, df, hp)))
+
+
+# A fight state is a tuple with one int per participant: its remaining HP,
+# or for a MonsterStack with `count` members (count - 1) * max_hp + front HP.
+# 0 means dead.
+
+@lru_cache(maxsize=None)
+def _hit(code: int, max_hp: int, atk: int, df: int):
+    # outcomes of one hit on a participant in state `code`: ((new code, p), ...)
+    behind = (code - 1) // max_hp  # stack members behind the front one
+    front = code - behind * max_hp
+    out = {}
+    for dmg, p in damage_pmf(atk, df):
+        # the front member dies without carry-over, the next one steps up at full HP
+        new = code - dmg if front > dmg else behind * max_hp
+        out[new] = out.get(new, 0.0) + p
+    return tuple(out.items())
+
+
+def _target(state, first: int, last: int, max_hp):
+    # alive participant in [first, last) with the lowest front HP, ties -> first
+    best = None
+    for i in range(first, last):
+        code = state[i]
+        if code:
+            front = code - (code - 1) // max_hp[i] * max_hp[i]
+            if best is None or front < best_hp:
+                best, best_hp = i, front
+    return best
+
+
+def _stack_attacks(state, p, attacks: int, first: int, last: int, max_hp, atk: int, df):
+    # successor states of `attacks` hits in a row by one attacker
+    branch = {state: p}
+    for _ in range(attacks):
+        after = {}
+        for s, q in branch.items():
+            t = _target(s, first, last, max_hp)
+            if t is None:
+                after[s] = after.get(s, 0.0) + q
+                continue
+            for c, r in _hit(s[t], max_hp[t], atk, df[t]):
+                s2 = s[:t] + (c,) + s[t + 1:]
+                after[s2] = after.get(s2, 0.0) + q * r
+        branch = after
+    return branch.items()
+
+
+def solve_encounter(players, monsters, max_rounds: int = 10_000, tolerance: float = 0.0) -> dict:
+    """Exact outcome of one fight (players and monsters as game objects,
+    nothing is changed). Returns {'win', 'rounds', 'rounds_pmf', 'states',
+    'lost'}: win probability, expected rounds, {rounds: probability}, the
+    number of distinct fight states visited and the probability dropped by
+    `tolerance` - with tolerance > 0, states less likely than that are
+    dropped after every round, so 'win' may be up to 'lost' too low."""
+    players = [p for p in players if p.is_alive()]
+    monsters = [m for m in monsters if m.is_alive()]
+    ents = players + monsters
+    P = len(players)
+    max_hp = [e.max_hp for e in ents]
+    atk = [e.atk for e in ents]
+    df = [e.df for e in ents]
+    start = tuple((getattr(e, 'count', 1) - 1) * e.max_hp + e.hp for e in ents)
+    # turn order as in TurnScheduler: speed descending, players first on ties
+    turns = sorted(range(len(ents)), key=lambda i: -ents[i].spd)
+    # who a participant attacks: the other side's slice of the state
+    sides = [(P, len(ents)) if i < P else (0, P) for i in range(len(ents))]
+
+    dist = {start: 1.0}
+    win = 0.0
+    rounds_pmf = {}
+    states = 1
+    lost = 0.0
+    for round_no in range(1, max_rounds + 1):
+        if not dist:
+            break
+        for actor in turns:
+            first, last = sides[actor]
+            a_atk, a_max = atk[actor], max_hp[actor]
+            targets = {}   # other side's part of the state -> target index
+            outcomes = {}  # (target, code) -> _hit outcomes of this attacker
+            new = {}
+            get = new.get
+            for state, p in dist.items():
+                code = state[actor]
+                if not code:
+                    new[state] = get(state, 0.0) + p
+                    continue
+                side = state[first:last]
+                t = targets.get(side, -1)
+                if t == -1:
+                    t = targets[side] = _target(state, first, last, max_hp)
+                if t is None:
+                    new[state] = get(state, 0.0) + p
+                elif code > a_max:
+                    # a MonsterStack attacks once per living member
+                    for s, q in _stack_attacks(state, p, (code - 1) // a_max + 1, first, last, max_hp, a_atk, df):
+                        new[s] = get(s, 0.0) + q
+                else:
+                    hits = outcomes.get((t, state[t]))
+                    if hits is None:
+                        hits = outcomes[(t, state[t])] = _hit(state[t], max_hp[t], a_atk, df[t])
+                    head, tail = state[:t], state[t + 1:]
+                    for c, r in hits:
+                        s = head + (c,) + tail
+                        new[s] = get(s, 0.0) + p * r
+            dist = new
+            states += len(dist)
+        # a fight ends after the round in which one side fell
+        ongoing = {}
+        for state, p in dist.items():
+            if p < tolerance:
+                lost += p
+                continue
+            players_alive = any(state[:P])
+            if players_alive and any(state[P:]):
+                ongoing[state] = p
+            else:
+                rounds_pmf[round_no] = rounds_pmf.get(round_no, 0.0) + p
+                if players_alive:
+                    win += p
+        dist = ongoing
+    return {'win': win, 'rounds': sum(r * p for r, p in rounds_pmf.items()),
+            'rounds_pmf': rounds_pmf, 'states': states, 'lost': lost}
+
+
+def make_party(keys):
+    return [make_character(f"Spieler{i}", k) for i, k in enumerate(keys, 1)]
+
+
+def wave_key(monsters):
+    return tuple((m.hp, m.atk, m.df, m.spd) for m in monsters)
+
+
+@lru_cache(maxsize=None)
+def _solve_cached(party_keys, wave):
+    monsters = [Monster(f"M{i}", hp, atk, df, spd) for i, (hp, atk, df, spd) in enumerate(wave)]
+    result = solve_encounter(make_party(party_keys), monsters, tolerance=PRUNE)
+    return result['win'], result['rounds']
+
+
+def _solve_job(job):
+    return _solve_cached(*job)
+
+
+def solve_wave(party_keys, wave_number: int, samples: int = SAMPLES, rng=None, target_se: float = TARGET_SE,
+               pool=None) -> dict:
+    """Fresh party against wave `wave_number`: generate_wave compositions,
+    each solved exactly (up to PRUNE), in batches of BATCH until `samples` are
+    done or the standard error is surely at most `target_se`. 'win' is the
+    sample mean over the compositions ('se' its standard error), exact only
+    for wave 1. A few bad compositions can decide a wave, so the stop uses
+    the largest spread win probabilities in [0, 1] can have, m(1 - m) with
+    m = (wins + 1) / (n + 2): a wave won or lost in every composition so far
+    still needs about 1 / target_se of them. Compositions that come up again
+    are not solved twice; `pool` (e.g. a ProcessPoolExecutor) solves a batch
+    in parallel."""
+    rng = rng if rng is not None else random.Random(0)
+    if wave_number == 1:
+        samples = 1  # wave 1 is always the same two goblins
+    keys = tuple(party_keys)
+    results = []
+    se = 0.0
+    while len(results) < samples:
+        batch = [(keys, wave_key(generate_wave(wave_number, rng))) for _ in range(min(BATCH, samples - len(results)))]
+        results += pool.map(_solve_job, batch) if pool is not None else map(_solve_job, batch)
+        n = len(results)
+        wins = sum(w for w, _ in results)
+        if n > 1:
+            mean = wins / n
+            se = math.sqrt(sum((w - mean) ** 2 for w, _ in results) / (n - 1) / n)
+        m = (wins + 1) / (n + 2)
+        if math.sqrt(m * (1 - m) / n) <= target_se:
+            break
+    n = len(results)
+    return {'wave': wave_number, 'win': sum(w for w, _ in results) / n, 'se': se,
+            'rounds': sum(r for _, r in results) / n, 'samples': n}
+
+
+def simulate_encounter(party_keys, wave, n: int, rng):
+    """Reference: the fight `wave` (wave_key tuples) n times through
+    game.combat_round, like run_wave. Returns (wins, list of rounds)."""
+    wins = 0
+    rounds = []
+    for _ in range(n):
+        players = make_party(party_keys)
+        monsters = [Monster(f"M{i}", hp, atk, df, spd) for i, (hp, atk, df, spd) in enumerate(wave)]
+        scheduler = TurnScheduler(players, monsters)
+        r = 0
+        while scheduler.target_id('player') is not None and scheduler.target_id('monster') is not None:
+            combat_round(players, monsters, rng, scheduler)
+            r += 1
+        wins += any(p.is_alive() for p in players)
+        rounds.append(r)
+    return wins, rounds
+
+
+def check(party_keys, waves, n: int, seed: int = 0):
+    """Compare the solver with n simulated fights per wave (one composition
+    per wave). Returns rows (wave, exact win, simulated win, exact rounds,
+    simulated rounds, ok) - ok means both z-scores are below 4."""
+    rows = []
+    for w in waves:
+        wave = wave_key(generate_wave(w, random.Random(seed + w)))
+        monsters = [Monster(f"M{i}", *stats) for i, stats in enumerate(wave)]
+        exact = solve_encounter(make_party(party_keys), monsters)
+        wins, rounds = simulate_encounter(party_keys, wave, n, random.Random(seed))
+        sim_win = wins / n
+        se_win = math.sqrt(max(0.0, exact['win'] * (1 - exact['win'])) / n)
+        mean_r = sum(rounds) / n
+        var_r = sum((r - mean_r) ** 2 for r in rounds) / max(1, n - 1)
+        se_r = math.sqrt(var_r / n)
+        # 1e-9: float rounding when the outcome is (almost) certain
+        ok = abs(sim_win - exact['win']) <= 4 * se_win + 1e-9 and abs(mean_r - exact['rounds']) <= 4 * se_r + 1e-9
+        rows.append((w, exact['win'], sim_win, exact['rounds'], mean_r, ok))
+    return rows
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    keys = arg_value(argv, '--party', ','.join(DEMO_KEYS)).split(',')
+    waves = [int(w) for w in arg_value(argv, '--waves', '1,2,3,4,5,6,7,8,9,10').split(',')]
+    seed = int(arg_value(argv, '--seed', 0))
+    unknown = [k for k in keys if k not in CHAR_TEMPLATES]
+    if unknown:
+        print(f"Unbekannte Rolle(n): {', '.join(unknown)} (erlaubt: {', '.join(CHAR_TEMPLATES)})")
+        sys.exit(2)
+    party = '/'.join(CHAR_TEMPLATES[k]['role'] for k in keys)
+
+    if '--check' in argv:
+        n = int(arg_value(argv, '--n', 20000))
+        print(f"Loeser vs. Simulation ({n} Kaempfe pro Welle, Party {party})")
+        failed = False
+        for w, win, sim_win, rounds, sim_rounds, ok in check(keys, waves, n, seed):
+            failed |= not ok
+            print(f"Welle {w:>2}: Sieg {win:.4f} / {sim_win:.4f}, Runden {rounds:.3f} / {sim_rounds:.3f} "
+                  f"{'OK' if ok else 'ABWEICHUNG'}")
+        sys.exit(1 if failed else 0)
+
+    samples = int(arg_value(argv, '--samples', SAMPLES))
+    target_se = float(arg_value(argv, '--se', TARGET_SE))
+    workers = int(arg_value(argv, '--workers', os.cpu_count() or 1))
+    print(f"Party {party}, frisch gegen jede Welle: Mittel ueber zufaellige Zusammensetzungen "
+          f"(jede exakt geloest) +- Standardfehler, bis {target_se:.1%} oder {samples} Zusammensetzungen")
+    rng = random.Random(seed)
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        for w in waves:
+            start = time.perf_counter()
+            r = solve_wave(keys, w, samples, rng, target_se, pool)
+            ms = (time.perf_counter() - start) * 1000
+            print(f"Welle {w:>2}: Sieg {r['win']:7.2%} +- {r['se']:.2%}, Runden {r['rounds']:5.2f}   "
+                  f"({r['samples']} Zusammensetzungen, {ms:.0f} ms)", flush=True)
+    finally:
+        if pool:
+            pool.shutdown()
+    # hits per role against the wave's goblins (first goblin of a sample wave)
+    print("\nErwartete Treffer bis zum Sieg gegen den ersten Goblin der Welle:")
+    for w in waves:
+        goblin = generate_wave(w, random.Random(seed + w))[0]
+        cells = [f"{CHAR_TEMPLATES[k]['role']} {expected_hits(CHAR_TEMPLATES[k]['atk'], goblin.df, goblin.hp):.2f}"
+                 for k in keys]
+        print(f"Welle {w:>2} (HP {goblin.hp}, DEF {goblin.df}): " + ', '.join(cells))
+
+
+if __name__ == "__main__":
+    main()
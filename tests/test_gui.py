@@ -0,0 +1,46 @@
+import os
+import random
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+pygame = pytest.importorskip('pygame')
+
+import gui  # noqa: E402  (needs the SDL settings above)
+
+
+def test_chunk_cache_stays_bounded_on_long_walk():
+    gui.configure(2000, 200)
+    pygame.init()
+    font = pygame.font.Font(None, 18)
+    grid = gui.TileMap(2000, 200)
+    renderer = gui.Renderer(pygame.Surface((gui.WIDTH, gui.HEIGHT)), font, grid)
+    monsters = gui.spawn_monsters(100, random.Random(1))
+    player = gui.make_player('1')
+    # chunks the viewport can touch, plus the margin on every side
+    bound = ((gui.VIEW_COLS // gui.CHUNK + 2 + 2 * gui.CHUNK_MARGIN)
+             * (gui.VIEW_ROWS // gui.CHUNK + 2 + 2 * gui.CHUNK_MARGIN))
+    most = 0
+    for x in range(0, 2000, 3):
+        renderer.draw(monsters, player, x, 100)
+        most = max(most, len(renderer.chunks))
+    assert most <= bound
+
+
+def test_dropped_chunk_is_redrawn_with_new_blocks():
+    gui.configure(500, 100)
+    pygame.init()
+    font = pygame.font.Font(None, 18)
+    grid = gui.TileMap(500, 100)
+    renderer = gui.Renderer(pygame.Surface((gui.WIDTH, gui.HEIGHT)), font, grid)
+    monsters = gui.MonsterMap()
+    player = gui.make_player('1')
+    renderer.draw(monsters, player, 5, 5)
+    before = renderer.screen.get_at((3 * gui.TILE + gui.TILE // 2, 3 * gui.TILE + gui.TILE // 2))
+    renderer.draw(monsters, player, 400, 5)  # far away: the first chunks are dropped
+    assert (0, 0) not in renderer.chunks
+    grid[3, 3] = gui.BLOCK
+    renderer.tiles_changed([(3, 3)])
+    renderer.draw(monsters, player, 5, 5)
+    assert renderer.screen.get_at((3 * gui.TILE + gui.TILE // 2, 3 * gui.TILE + gui.TILE // 2)) != before
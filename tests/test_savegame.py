@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+import subprocess
+
+GAME = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'game.py')
+
+
+def run_game(*args, cwd):
+    return subprocess.run([sys.executable, GAME, *args], cwd=cwd, capture_output=True, text=True, timeout=60)
+
+
+def make_checkpoint(tmp_path):
+    done = run_game('--auto', '--seed', '7', '--quiet', '--checkpoint', 'ck.sav', '--checkpoint-every', '0',
+                    cwd=tmp_path)
+    assert done.returncode == 0, done.stderr
+    assert (tmp_path / 'ck.sav').exists()
+
+
+def test_resume_with_console_output(tmp_path):
+    make_checkpoint(tmp_path)
+    resumed = run_game('--checkpoint', 'ck.sav', '--resume', '--verbosity', '3', cwd=tmp_path)
+    assert resumed.returncode == 0, resumed.stderr
+    assert 'geladen: weiter mit Welle' in resumed.stdout
+    assert ' trifft Spieler' in resumed.stdout
+
+
+def test_resume_with_json_log(tmp_path):
+    make_checkpoint(tmp_path)
+    resumed = run_game('--checkpoint', 'ck.sav', '--resume', '--quiet', '--log-json', 'log.jsonl', cwd=tmp_path)
+    assert resumed.returncode == 0, resumed.stderr
+    events = [json.loads(line) for line in (tmp_path / 'log.jsonl').read_text().splitlines()]
+    assert any(e['event'] == 'attack' for e in events)
+
+
+def test_checkpoint_any_seed(tmp_path):
+    for seed in ('-5', str(2 ** 64 + 3)):
+        done = run_game('--auto', '--seed', seed, '--quiet', '--checkpoint', 'ck.sav', '--checkpoint-every', '0',
+                        cwd=tmp_path)
+        assert done.returncode == 0, done.stderr
+        resumed = run_game('--checkpoint', 'ck.sav', '--resume', '--quiet', cwd=tmp_path)
+        assert resumed.returncode == 0, resumed.stderr
+        assert f"(Seed {seed})" in resumed.stdout
+
+
+def test_encode_game_round_trips_seed():
+    import random
+    import savegame
+    from game import make_character
+    players = [make_character('A', '1')]
+    rng = random.Random(1)
+    for seed in (-5, 0, 2 ** 64 + 3, -(2 ** 100)):
+        state = savegame.decode_game(savegame.encode_game(players, 3, rng, {'seed': seed, 'rounds': [2, 4]},
+                                                          True, False))
+        assert state['seed'] == seed
+        assert (state['wave'], state['rounds'], state['auto'], state['horde']) == (3, [2, 4], True, False)
+        assert state['rng_state'] == rng.getstate()